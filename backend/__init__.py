@@ -0,0 +1,5 @@
+from dotenv import find_dotenv, load_dotenv
+
+# Every entry point (the app, backend.server, the bulk CLI, benchmarks) imports this package first, so .env
+# reaches Settings and every component reading its own knobs from os.environ. The real environment wins.
+load_dotenv(find_dotenv(usecwd=True))
@@ -1,7 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, APIRouter
+from backend import metrics
 from backend.database import db
 from backend.auth import auth
-app = FastAPI()
+from backend.database.utils import pool
+from backend.database.utils.pool import init_pool, close_pool
+from backend.database.utils.user_cache import user_cache
+from backend.database.utils.single_flight import user_lookups
+from backend.auth.hashing import password_hasher
+from backend.auth import tokens
+from backend.auth.tokens import token_cache, token_versions
+from backend.auth.rate_limit import login_rate_limiter
+from backend.database.utils.memory_client import uses_memory_backend
+from backend.settings import get_settings
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not uses_memory_backend():
+        await init_pool()
+    hasher_warmup = None
+    if get_settings().startup_warmup == 'background':
+        # Accept traffic right away, only logins that arrive during the warmup wait for the hashing workers
+        hasher_warmup = asyncio.create_task(password_hasher.warmup())
+    else:
+        await password_hasher.warmup()
+    tokens.warmup()
+    yield
+    if hasher_warmup is not None:
+        hasher_warmup.cancel()
+        # A failed warmup only meant the first logins started the workers themselves
+        with suppress(asyncio.CancelledError, Exception):
+            await hasher_warmup
+    password_hasher.shutdown()
+    await close_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth.router)
+app.include_router(auth.jwks_router)
 app.include_router(db.router)
+
+if metrics.ENABLED:
+    settings = get_settings()
+    development = settings.env in {'dev', 'test'}
+    metrics.install(
+        app,
+        server_timing=development if settings.metrics_server_timing is None else settings.metrics_server_timing,
+        serve_endpoint=development or settings.metrics_token is not None,
+        scrape_token=settings.metrics_token,
+    )
+    metrics.registry.register_collector(metrics.stats_collector('thriftr_password_hasher', password_hasher.stats))
+    metrics.registry.register_collector(metrics.stats_collector('thriftr_token_cache', token_cache.stats))
+    metrics.registry.register_collector(metrics.stats_collector('thriftr_token_version_cache', token_versions.stats))
+    metrics.registry.register_collector(metrics.stats_collector('thriftr_login_rate_limit', login_rate_limiter.stats))
+    metrics.registry.register_collector(metrics.stats_collector('thriftr_user_cache', user_cache.stats))
+    metrics.registry.register_collector(metrics.stats_collector('thriftr_user_lookups', user_lookups.stats))
+    metrics.registry.register_collector(metrics.stats_collector('thriftr_db_pool', pool.stats))
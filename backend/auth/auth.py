@@ -1,118 +1,111 @@
 from pydantic import BaseModel
 from urllib.parse import quote
 from starlette import status
-from passlib.context import CryptContext
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from jose import jwt, JWTError
-from fastapi import APIRouter, Depends
-from fastapi import HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from fastapi import HTTPException, Response
+from fastapi.responses import JSONResponse
 from backend.auth.models.login_request import LoginRequest
 from backend.database.models.user import UserResponse 
 from backend.auth.models.token import Token
 from backend.auth.models.register_request import RegisterRequest
-from backend.database.utils.db_utils import get_db_connection, get_table_by_env, user_exists, get_user, get_user_by_id, delete_user
+from backend.auth.models.refresh_request import RefreshRequest
+from backend.auth.hashing import password_hasher
+from backend.auth.rate_limit import login_rate_limiter
+from backend.auth.tokens import AccessClaims, create_access_token, access_token_claims, revoke_user_tokens, revoke_deleted_user_tokens, jwks, token_versions
+from backend.auth.refresh_tokens import issue_refresh_token, rotate_refresh_token, RefreshTokenError
+from backend.auth.dependencies import Principal, get_access_claims, get_current_principal, credential_exception
+from backend.database.utils.db_utils import AsyncClient, get_db_connection, db_session, insert_user, UserConflictError, get_user, delete_user_by_id, update_user_password, get_user_profile
 from typing import Annotated
-from supabase import Client
-from datetime import datetime, timedelta, timezone
-import os
+from datetime import timedelta
+import logging
 
-router = APIRouter(prefix='/api/auth', tags=['auth'])
-
-SECRET_KEY = os.environ.get('AUTH_HASH_KEY')
-ALGORITHM = os.environ.get('SECRET_ALGORITHM')
-
-if SECRET_KEY is None or ALGORITHM is None:
-    raise RuntimeError("AUTH_HASH_KEY and SECRET_ALGORITHM must be set in environment")
-
-crypt_context = CryptContext(schemes=['bcrypt_sha256'], deprecated='auto')
-oauth2_bearer = OAuth2PasswordBearer(tokenUrl='/api/auth/token')
-
-DUMMY_PASSWORD_HASH = "$bcrypt-sha256$v=2,t=2b,r=12$N.b83rO2ds45hzLmXMuZOO$53eZnLaXPEHLPuonMVYv4ur5qbilq0C"
+logger = logging.getLogger(__name__)
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
-    data_to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=30)
-    data_to_encode.update({'exp': expire})
-    encoded_jwt = jwt.encode(data_to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+router = APIRouter(prefix='/api/auth', tags=['auth'])
+jwks_router = APIRouter(tags=['auth'])
 
+ACCESS_TOKEN_EXPIRES = timedelta(minutes=30)
 
-@router.delete('/current_user', status_code=status.HTTP_200_OK)
-async def delete_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotated[Client, Depends(get_db_connection)]):
-    credential_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not verify credentials')
+async def store_rehashed_password(user_id: int, password_hash: str):
+    # Best effort: if this fails the old hash still verifies and the next login retries the upgrade
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_str: str = payload.get('sub')
-        if user_id_str is None:
-            raise credential_exception
-        user_id = int(user_id_str)
-    except (JWTError, ValueError):
-        raise credential_exception
+        async with db_session() as db:
+            await update_user_password(db, user_id=user_id, password_hash=password_hash)
+    except Exception:
+        logger.exception('Storing the rehashed password of user %s failed', user_id)
 
-    user = get_user_by_id(db, user_id=user_id)
-    if user is None:
-        raise credential_exception
+@jwks_router.get('/.well-known/jwks.json', status_code=status.HTTP_200_OK)
+async def get_jwks(response: Response):
+    # Consumers cache the key set and verify tokens locally, they refetch when they meet an unknown kid
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return jwks()
 
-    username = user.get('username')
-    deleted = delete_user(db, identifier=username)
-    if not deleted:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='Account deletion failed')
+@router.delete('/current_user', status_code=status.HTTP_200_OK)
+async def delete_current_user(claims: Annotated[AccessClaims, Depends(get_access_claims)], db: Annotated[AsyncClient, Depends(get_db_connection)]):
+    # The token already names the account, no profile lookup before the delete: a revoked token simply matches no row
+    user_id = claims.user_id
+    deleted_user = await delete_user_by_id(db, user_id=user_id, token_version=claims.version)
+    if deleted_user is None:
+        raise credential_exception()
+    await revoke_deleted_user_tokens(db, [user_id])
     
-    return {'message': 'Account deleted successfully', 'username': username}
+    return {'message': 'Account deleted successfully', 'username': deleted_user['username']}
 
-@router.get('/current_user', status_code=status.HTTP_200_OK)
-async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotated[Client, Depends(get_db_connection)]) -> UserResponse:
-    credential_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_str: str = payload.get('sub')
-        if user_id_str is None:
-            raise credential_exception
-        user_id = int(user_id_str)
-    except (JWTError, ValueError):
-        raise credential_exception
-    user = get_user_by_id(db, user_id=user_id)
-    if user is not None:
-        del user['password']
-        return UserResponse.model_validate(user)
-    raise credential_exception
+@router.get('/current_user', status_code=status.HTTP_200_OK, response_model=UserResponse)
+async def get_current_user(principal: Annotated[Principal, Depends(get_current_principal)]) -> JSONResponse:
+    # Returned as-is, the profile came from our own table or a token we signed so response_model is documentation only
+    return JSONResponse(principal.user.model_dump())
 
 @router.post("/token", status_code=status.HTTP_200_OK)
-async def login(request: LoginRequest, db: Annotated[Client, Depends(get_db_connection)]) -> Token:
+async def login(request: LoginRequest, http_request: Request, db: Annotated[AsyncClient, Depends(get_db_connection)], background_tasks: BackgroundTasks) -> Token:
     credential_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     user_identifier = request.username if request.username else request.email
-    user = get_user(db = db, identifier = user_identifier) 
+    await login_rate_limiter.check(http_request.client.host if http_request.client else 'unknown', user_identifier)
+    user = await get_user(db = db, identifier = user_identifier) 
 
     if user is None:
-        crypt_context.verify(request.password, DUMMY_PASSWORD_HASH)
+        await password_hasher.verify(request.password, await password_hasher.dummy_hash())
         raise credential_exception 
     database_password = user.get('password')
-    if not crypt_context.verify(request.password, database_password):
+    verified, new_password_hash = await password_hasher.verify_and_update(request.password, database_password)
+    if not verified:
         raise credential_exception
-
-    expiration_delta = timedelta(minutes=30) 
-    access_token = create_access_token(data={"sub": str(user.get('id'))}, expires_delta=expiration_delta)
-    return Token(access_token=access_token, token_type="bearer")
+    if new_password_hash is not None:
+        background_tasks.add_task(store_rehashed_password, user['id'], new_password_hash)
+
+    # The row was just read, claims tokens minted from it are answered without another lookup
+    token_versions.put(user['id'], user.get('token_version') or 0)
+    access_token = create_access_token(data=access_token_claims(user), expires_delta=ACCESS_TOKEN_EXPIRES)
+    refresh_token = await issue_refresh_token(db, user_id=user['id'])
+    return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+@router.post("/refresh", status_code=status.HTTP_200_OK)
+async def refresh(request: RefreshRequest, db: Annotated[AsyncClient, Depends(get_db_connection)]) -> Token:
+    # Renewal costs a token lookup and a JWT sign, no password verify
+    credential_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    try:
+        user_id, refresh_token = await rotate_refresh_token(db, request.refresh_token)
+    except RefreshTokenError as error:
+        if error.reason == 'reused':
+            await revoke_user_tokens(db, error.user_id)
+        raise credential_exception
+    # The cached profile carries the token_version the new access token is minted with
+    profile = await get_user_profile(db, user_id)
+    if profile is None:
+        raise credential_exception
+    access_token = create_access_token(data=access_token_claims(profile.to_row()), expires_delta=ACCESS_TOKEN_EXPIRES)
+    return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
 
 @router.post("/register", status_code=status.HTTP_200_OK)
-async def register_user(request: RegisterRequest, db: Annotated[Client, Depends(get_db_connection)]):
+async def register_user(request: RegisterRequest, db: Annotated[AsyncClient, Depends(get_db_connection)]):
     username = request.username
     email = request.email
-    users_table = get_table_by_env('users')
-
-    email_in_use = user_exists(db, email)
-    username_in_use = user_exists(db, username)
 
-    if username_in_use:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account with that username already exists")
-    if email_in_use:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account with that email already exists")
-
-    hashed_pass = crypt_context.hash(request.password)
-    account_creation_res = (db.table(users_table).insert({'username': username, 'password': hashed_pass, 'email': email}).execute())
-    if not account_creation_res.data:
+    hashed_pass = await password_hasher.hash(request.password)
+    try:
+        created_user = await insert_user(db, username=username, email=email, password_hash=hashed_pass)
+    except UserConflictError as conflict:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(conflict))
+    if created_user is None:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Account creation failed, try again later")
     return {"REQUEST": "registration", "user_registered": username, "SUCCESS": True} 
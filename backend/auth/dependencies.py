@@ -0,0 +1,63 @@
+import time
+from dataclasses import dataclass, field
+from typing import Annotated
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer
+from jose.exceptions import JWTError
+from starlette import status
+from backend.auth.tokens import AccessClaims, decode_access_claims, token_versions
+from backend.database.models.user import UserRow
+from backend.database.utils.db_utils import AsyncClient, get_db_connection, get_user_profile
+
+oauth2_bearer = OAuth2PasswordBearer(tokenUrl='/api/auth/token')
+
+
+@dataclass
+class Principal:
+    user_id: int
+    user: UserRow
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def credential_exception() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={'WWW-Authenticate': 'Bearer'})
+
+
+def record_stage(request: Request, stage: str, started: float) -> None:
+    # Stage durations in seconds, kept on the request so middleware and handlers can report them
+    timings = getattr(request.state, 'auth_timings', None)
+    if timings is None:
+        timings = request.state.auth_timings = {}
+    timings[stage] = time.perf_counter() - started
+
+
+async def get_access_claims(request: Request, token: Annotated[str, Depends(oauth2_bearer)]) -> AccessClaims:
+    started = time.perf_counter()
+    try:
+        claims = decode_access_claims(token)
+    except (JWTError, ValueError):
+        raise credential_exception()
+    finally:
+        record_stage(request, 'token_decode', started)
+    return claims
+
+
+async def get_current_principal(request: Request, claims: Annotated[AccessClaims, Depends(get_access_claims)], db: Annotated[AsyncClient, Depends(get_db_connection)]) -> Principal:
+    # FastAPI caches dependencies per request, so every route and sub-dependency asking for the
+    # principal shares this single decode and lookup
+    if claims.username is not None and claims.email is not None:
+        # Signed claims tokens already carry the profile, only their version needs checking. Deleting or
+        # revoking a user drops its cached version, so the next request reads the row below.
+        version = token_versions.get(claims.user_id)
+        if version is not None:
+            if claims.version < version:
+                raise credential_exception()
+            user = UserRow(id=claims.user_id, username=claims.username, email=claims.email, token_version=claims.version)
+            return Principal(user_id=claims.user_id, user=user, timings=request.state.auth_timings)
+    started = time.perf_counter()
+    user = await get_user_profile(db, user_id=claims.user_id)
+    record_stage(request, 'user_lookup', started)
+    if user is None or claims.version < user.token_version:
+        raise credential_exception()
+    token_versions.put(claims.user_id, user.token_version)
+    return Principal(user_id=claims.user_id, user=user, timings=request.state.auth_timings)
@@ -0,0 +1,275 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from starlette import status
+from typing import TYPE_CHECKING
+from backend.metrics import observe_stage
+
+if TYPE_CHECKING:
+    # passlib is imported by the first hash, verify or calibration (the startup warmup), in the process that runs it
+    from passlib.context import CryptContext
+
+SUPPORTED_SCHEMES = ('argon2', 'bcrypt_sha256')
+BCRYPT_ROUNDS_RANGE = (10, 16)
+ARGON2_TIME_COST_RANGE = (1, 10)
+
+_crypt_contexts: dict[str, 'CryptContext'] = {}
+
+
+def argon2_available() -> bool:
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HashPolicy:
+    def __init__(self, schemes: tuple[str, ...] = ('bcrypt_sha256',), bcrypt_rounds: int = 12, argon2_time_cost: int = 3, argon2_memory_cost: int = 65536, target_ms: float | None = None):
+        unknown = set(schemes) - set(SUPPORTED_SCHEMES)
+        if not schemes or unknown:
+            raise ValueError(f'Unsupported hashing schemes: {", ".join(sorted(unknown)) or "none given"}')
+        if 'argon2' in schemes and not argon2_available():
+            raise RuntimeError('argon2 hashing requested but argon2-cffi is not installed, pip install -r requirements.txt')
+        self.schemes = tuple(schemes)
+        self.bcrypt_rounds = bcrypt_rounds
+        self.argon2_time_cost = argon2_time_cost
+        self.argon2_memory_cost = argon2_memory_cost
+        self.target_ms = target_ms
+
+    @classmethod
+    def from_env(cls) -> 'HashPolicy':
+        target_ms = os.environ.get('HASH_TARGET_MS')
+        return cls(
+            schemes=tuple(scheme.strip() for scheme in os.environ.get('HASH_SCHEMES', 'bcrypt_sha256').split(',') if scheme.strip()),
+            bcrypt_rounds=int(os.environ.get('HASH_BCRYPT_ROUNDS', '12')),
+            argon2_time_cost=int(os.environ.get('HASH_ARGON2_TIME_COST', '3')),
+            argon2_memory_cost=int(os.environ.get('HASH_ARGON2_MEMORY_COST', '65536')),
+            target_ms=float(target_ms) if target_ms else None,
+        )
+
+    @property
+    def primary(self) -> str:
+        return self.schemes[0]
+
+    def to_config(self) -> str:
+        # Every scheme but the first is deprecated, and hashes below the current cost count as outdated,
+        # so verify_and_update() upgrades legacy hashes. Stronger existing hashes are never downgraded.
+        from passlib.context import CryptContext
+        settings = {'schemes': list(self.schemes), 'deprecated': 'auto'}
+        if 'bcrypt_sha256' in self.schemes:
+            settings.update(bcrypt_sha256__default_rounds=self.bcrypt_rounds, bcrypt_sha256__min_rounds=self.bcrypt_rounds)
+        if 'argon2' in self.schemes:
+            settings.update(argon2__default_rounds=self.argon2_time_cost, argon2__min_rounds=self.argon2_time_cost, argon2__memory_cost=self.argon2_memory_cost)
+        return CryptContext(**settings).to_string()
+
+
+def get_crypt_context(config: str) -> 'CryptContext':
+    # Built lazily and cached per policy so every worker process parses a config once
+    context = _crypt_contexts.get(config)
+    if context is None:
+        from passlib.context import CryptContext
+        context = _crypt_contexts[config] = CryptContext.from_string(config)
+    return context
+
+
+def _timed_verify(config: str, password: str, password_hash: str) -> tuple[bool, float]:
+    start = time.perf_counter()
+    verified = get_crypt_context(config).verify(password, password_hash)
+    return verified, time.perf_counter() - start
+
+
+def _timed_verify_and_update(config: str, password: str, password_hash: str) -> tuple[tuple[bool, str | None], float]:
+    start = time.perf_counter()
+    result = get_crypt_context(config).verify_and_update(password, password_hash)
+    return result, time.perf_counter() - start
+
+
+def _timed_hash(config: str, password: str) -> tuple[str, float]:
+    start = time.perf_counter()
+    password_hash = get_crypt_context(config).hash(password)
+    return password_hash, time.perf_counter() - start
+
+
+def _calibrate_cost(scheme: str, target_seconds: float, argon2_memory_cost: int) -> tuple[int, float]:
+    # Times one hash at the cheapest allowed cost and extrapolates: bcrypt doubles per round,
+    # argon2 grows linearly with its time cost
+    from passlib.context import CryptContext
+    if scheme == 'bcrypt_sha256':
+        low, high = BCRYPT_ROUNDS_RANGE
+        context = CryptContext(schemes=[scheme], bcrypt_sha256__default_rounds=low)
+    else:
+        low, high = ARGON2_TIME_COST_RANGE
+        context = CryptContext(schemes=[scheme], argon2__default_rounds=low, argon2__memory_cost=argon2_memory_cost)
+    start = time.perf_counter()
+    context.hash('calibration')
+    elapsed = time.perf_counter() - start
+    if scheme == 'bcrypt_sha256':
+        cost = low + math.floor(math.log2(max(target_seconds / elapsed, 1.0)))
+    else:
+        cost = math.floor(target_seconds / elapsed)
+    return min(max(cost, low), high), elapsed
+
+
+class HashingMetrics:
+    def __init__(self):
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    def record(self, queue_wait: float, hash_time: float) -> None:
+        self.completed += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.hash_time_total += hash_time
+        self.hash_time_max = max(self.hash_time_max, hash_time)
+
+    def snapshot(self) -> dict:
+        completed = self.completed or 1
+        return {
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'queue_wait_avg': self.queue_wait_total / completed,
+            'queue_wait_max': self.queue_wait_max,
+            'hash_time_avg': self.hash_time_total / completed,
+            'hash_time_max': self.hash_time_max,
+        }
+
+
+class PasswordHasher:
+    def __init__(self, executor_kind: str = 'process', max_workers: int | None = None, max_queue: int = 64, policy: HashPolicy | None = None):
+        if executor_kind not in {'process', 'thread'}:
+            raise ValueError(f'Unknown hashing executor: {executor_kind}')
+        self.executor_kind = executor_kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.metrics = HashingMetrics()
+        self.policy = policy or HashPolicy()
+        self.calibrated = False
+        self._config: str | None = None
+        self._dummy_hash: str | None = None
+        self._executor: Executor | None = None
+        self._in_flight = 0
+
+    @classmethod
+    def from_env(cls) -> 'PasswordHasher':
+        max_workers = os.environ.get('HASH_MAX_WORKERS')
+        return cls(
+            executor_kind=os.environ.get('HASH_EXECUTOR', 'process'),
+            max_workers=int(max_workers) if max_workers else None,
+            max_queue=int(os.environ.get('HASH_MAX_QUEUE', '64')),
+            policy=HashPolicy.from_env(),
+        )
+
+    @property
+    def config(self) -> str:
+        # Built on first use, so creating the hasher at import time does not load passlib
+        if self._config is None:
+            self._config = self.policy.to_config()
+        return self._config
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == 'process':
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+                except (NotImplementedError, OSError, ImportError):
+                    self.executor_kind = 'thread'
+            if self.executor_kind == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hasher')
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.metrics.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server busy, try again later", headers={'Retry-After': '1'})
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            try:
+                result, hash_time = await loop.run_in_executor(self._get_executor(), func, *args)
+            except BrokenProcessPool:
+                # A dead worker process poisons the whole pool, keep serving from threads instead
+                self.shutdown()
+                self.executor_kind = 'thread'
+                result, hash_time = await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+        queue_wait = max(time.perf_counter() - submitted - hash_time, 0.0)
+        self.metrics.record(queue_wait=queue_wait, hash_time=hash_time)
+        observe_stage('hash.queue', queue_wait)
+        observe_stage('hash', hash_time)
+        return result
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(_timed_verify, self.config, password, password_hash)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> tuple[bool, str | None]:
+        # The replacement hash is only returned when the password matched and the stored hash is outdated
+        return await self._run(_timed_verify_and_update, self.config, password, password_hash)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_timed_hash, self.config, password)
+
+    def recognizes(self, password_hash: str) -> bool:
+        # True for hashes any scheme of the current policy can verify, so imports can keep them as they are
+        return get_crypt_context(self.config).identify(password_hash, required=False) is not None
+
+    async def dummy_hash(self) -> str:
+        # Unknown users are checked against a hash made with the current policy so they cost as much as real ones
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+        return self._dummy_hash
+
+    def apply_policy(self, policy: HashPolicy) -> None:
+        self.policy = policy
+        self._config = None
+        self._dummy_hash = None
+
+    async def calibrate(self) -> None:
+        if self.policy.target_ms is None or self.calibrated:
+            return
+        loop = asyncio.get_running_loop()
+        cost, _ = await loop.run_in_executor(self._get_executor(), _calibrate_cost, self.policy.primary, self.policy.target_ms / 1000, self.policy.argon2_memory_cost)
+        if self.policy.primary == 'bcrypt_sha256':
+            self.policy.bcrypt_rounds = cost
+        else:
+            self.policy.argon2_time_cost = cost
+        self.apply_policy(self.policy)
+        self.calibrated = True
+
+    async def warmup(self) -> None:
+        # Calibrates the cost, then spawns the workers and builds their crypt contexts before the first real login
+        await self.calibrate()
+        password_hash = await self.dummy_hash()
+        await asyncio.gather(*(self.verify('warmup', password_hash) for _ in range(self.max_workers)))
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.executor_kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'in_flight': self._in_flight,
+            'scheme': self.policy.primary,
+            'bcrypt_rounds': self.policy.bcrypt_rounds,
+            'argon2_time_cost': self.policy.argon2_time_cost,
+            **self.metrics.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher.from_env()
@@ -0,0 +1,162 @@
+"""Asymmetric JWT signing keys.
+
+Keys are PEM private keys (P-256 for ES256, RSA for RS256, Ed25519 for EdDSA with the pyjwt codec) in
+one directory, the file name (minus .pem) is the key id (`kid`):
+
+    python -m backend.auth.keys generate keys/ --kid 2026-10
+
+Tokens are signed with the active key and carry its kid, verification picks the key by kid and every
+key in the directory is published at /.well-known/jwks.json so other services can verify tokens
+locally. The active key is named by an `active` file in the directory, or is the newest key file.
+The directory is re-read when it changes, so rotating is: add the new key, wait for consumers to
+pick up the JWKS, point `active` at it, and delete the old key once its tokens have expired.
+"""
+import argparse
+import base64
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+ACTIVE_FILE = 'active'
+
+
+def _b64(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b'=').decode()
+
+
+def _int_bytes(value: int) -> bytes:
+    return value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+
+class SigningKey:
+    __slots__ = ('kid', 'algorithm', 'private_key', 'public_key', 'public_jwk')
+
+    def __init__(self, kid: str, algorithm: str, private_key):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.public_jwk = {**public_jwk(self.public_key), 'alg': algorithm, 'kid': kid, 'use': 'sig'}
+
+
+def public_jwk(public_key) -> dict:
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        numbers = public_key.public_numbers()
+        return {'kty': 'EC', 'crv': 'P-256', 'x': _b64(numbers.x.to_bytes(32, 'big')), 'y': _b64(numbers.y.to_bytes(32, 'big'))}
+    if isinstance(public_key, rsa.RSAPublicKey):
+        numbers = public_key.public_numbers()
+        return {'kty': 'RSA', 'n': _b64(_int_bytes(numbers.n)), 'e': _b64(_int_bytes(numbers.e))}
+    raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return {'kty': 'OKP', 'crv': 'Ed25519', 'x': _b64(raw)}
+
+
+def key_algorithm(private_key) -> str:
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(private_key.curve, ec.SECP256R1):
+        return 'ES256'
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return 'RS256'
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return 'EdDSA'
+    raise RuntimeError(f'Unsupported signing key type: {type(private_key).__name__}')
+
+
+def load_signing_key(kid: str, pem: bytes, algorithms: frozenset[str] | None = None) -> SigningKey:
+    # Parsed once here, signing and verifying reuse the key objects
+    private_key = serialization.load_pem_private_key(pem, password=None)
+    algorithm = key_algorithm(private_key)
+    if algorithms is not None and algorithm not in algorithms:
+        raise RuntimeError(f'{algorithm} key {kid} is not supported by the configured token codec')
+    return SigningKey(kid, algorithm, private_key)
+
+
+class KeyRing:
+    def __init__(self, directory: str, reload_interval: float = 30.0, on_reload: Callable[[], None] | None = None, clock: Callable[[], float] = time.monotonic, algorithms: frozenset[str] | None = None):
+        self.directory = Path(directory)
+        self.reload_interval = reload_interval
+        self.algorithms = algorithms
+        self.on_reload = on_reload
+        self.clock = clock
+        self.keys: dict[str, SigningKey] = {}
+        self.active_kid: str | None = None
+        self._fingerprint: tuple | None = None
+        self._checked_at = float('-inf')
+        self.reload()
+
+    def _scan(self) -> tuple:
+        entries = []
+        for path in self.directory.iterdir():
+            if path.suffix == '.pem' or path.name == ACTIVE_FILE:
+                stat = path.stat()
+                entries.append((path.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    def reload(self) -> None:
+        fingerprint = self._scan()
+        paths = sorted(self.directory.glob('*.pem'), key=lambda path: (path.stat().st_mtime_ns, path.stem))
+        keys = {path.stem: load_signing_key(path.stem, path.read_bytes(), self.algorithms) for path in paths}
+        if not keys:
+            raise RuntimeError(f'No signing keys found in {self.directory}')
+        active_path = self.directory / ACTIVE_FILE
+        active_kid = active_path.read_text().strip() if active_path.exists() else paths[-1].stem
+        if active_kid not in keys:
+            raise RuntimeError(f'Active signing key {active_kid} not found in {self.directory}')
+        self.keys, self.active_kid, self._fingerprint = keys, active_kid, fingerprint
+        if self.on_reload is not None:
+            self.on_reload()
+
+    def refresh(self, force: bool = False) -> None:
+        # A directory listing per reload_interval, keys are only re-parsed when a file changed
+        now = self.clock()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        if self._scan() != self._fingerprint:
+            try:
+                self.reload()
+            except (RuntimeError, ValueError, OSError):
+                # A half-written key file must not take signing down, keep the last good keys
+                pass
+
+    def active(self) -> SigningKey:
+        self.refresh()
+        return self.keys[self.active_kid]
+
+    def get(self, kid: str | None) -> SigningKey | None:
+        self.refresh()
+        if kid not in self.keys and self.clock() - self._checked_at >= 1.0:
+            # Another worker may already sign with a key this one has not loaded yet, at most one forced check a second
+            self.refresh(force=True)
+        return self.keys.get(kid)
+
+    def jwks(self) -> dict:
+        self.refresh()
+        return {'keys': [key.public_jwk for key in self.keys.values()]}
+
+
+def generate_key(directory: str, kid: str) -> Path:
+    path = Path(directory) / f'{kid}.pem'
+    if path.exists():
+        raise SystemExit(f'{path} already exists')
+    pem = ec.generate_private_key(ec.SECP256R1()).private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(pem)
+    path.chmod(0o600)
+    return path
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help='write a new ES256 private key into the key directory')
+    generate.add_argument('directory')
+    generate.add_argument('--kid', default=time.strftime('%Y%m%d%H%M%S'))
+    args = parser.parse_args(argv)
+    print(generate_key(args.directory, args.kid))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,4 @@
+from pydantic import BaseModel, Field
+
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(min_length=1, max_length=256)
@@ -0,0 +1,58 @@
+import os
+import re
+import string
+from functools import lru_cache
+from typing import Annotated
+from pydantic import AfterValidator, Field, WithJsonSchema
+from pydantic.networks import validate_email
+
+USERNAME_CHARACTERS = re.compile(r"[A-Za-z0-9_]+")
+# Letters and digits in runs joined by single underscores, i.e. every rule below at once
+VALID_USERNAME = re.compile(r"[A-Za-z0-9]+(?:_[A-Za-z0-9]+)*")
+
+UPPERCASE = frozenset(string.ascii_uppercase)
+LOWERCASE = frozenset(string.ascii_lowercase)
+DIGITS = frozenset(string.digits)
+ALPHANUMERIC = UPPERCASE | LOWERCASE | DIGITS
+
+
+def validate_username(username: str) -> str:
+    if VALID_USERNAME.fullmatch(username):
+        return username
+    # Slow path only to pick the same error the individual rules would report first
+    if not USERNAME_CHARACTERS.fullmatch(username):
+        raise ValueError("Username can only contain letters, numbers, and underscores")
+
+    if username.startswith("_") or username.endswith("_"):
+        raise ValueError("Username cannot start or end with '_'")
+
+    if "__" in username:
+        raise ValueError("Username cannot contain consecutive underscores")
+
+    return username
+
+
+def validate_password(password: str) -> str:
+    # One pass over the password to build its character set, then cheap set checks per rule
+    characters = set(password)
+    if characters.isdisjoint(UPPERCASE):
+        raise ValueError("Password must contain at least one uppercase letter")
+    if characters.isdisjoint(LOWERCASE):
+        raise ValueError("Password must contain at least one lowercase letter")
+    if characters.isdisjoint(DIGITS):
+        raise ValueError("Password must contain at least one number")
+    if characters <= ALPHANUMERIC:
+        raise ValueError("Password must contain at least one special character")
+    return password
+
+
+@lru_cache(maxsize=int(os.environ.get('EMAIL_VALIDATION_CACHE_SIZE', '4096')))
+def normalize_email(email: str) -> str:
+    # Same parsing and normalization as EmailStr, cached because the same addresses log in again and again.
+    # Invalid addresses raise, and lru_cache never stores exceptions.
+    return validate_email(email)[1]
+
+
+Username = Annotated[str, Field(min_length=3), AfterValidator(validate_username)]
+Password = Annotated[str, Field(min_length=8), AfterValidator(validate_password)]
+Email = Annotated[str, AfterValidator(normalize_email), WithJsonSchema({'type': 'string', 'format': 'email'})]
@@ -0,0 +1,109 @@
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable
+from fastapi import HTTPException
+from starlette import status
+
+PERIODS = {'second': 1.0, 'minute': 60.0, 'hour': 3600.0}
+DEFAULT_IP_LIMIT = '30/minute'
+DEFAULT_IDENTIFIER_LIMIT = '10/minute'
+
+
+class RateLimitStore(ABC):
+    # Token buckets live behind this interface so several workers can share one store (redis, memcached)
+
+    @abstractmethod
+    async def take(self, key: str, capacity: float, refill_rate: float, now: float) -> float:
+        # Takes one token from the bucket, returns 0 when allowed or the seconds until a token is available
+        ...
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        ...
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, capacity: float, refill_rate: float, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            return (1 - tokens) / refill_rate
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        # Evicting the least recently used bucket only forgets a client that has been quiet the longest
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0
+
+    async def reset(self, key: str) -> None:
+        self._buckets.pop(key, None)
+
+
+class RateLimit:
+    def __init__(self, attempts: int, period: float):
+        if attempts <= 0 or period <= 0:
+            raise ValueError('Rate limits need a positive number of attempts and period')
+        self.capacity = float(attempts)
+        self.refill_rate = attempts / period
+
+    @classmethod
+    def parse(cls, value: str) -> 'RateLimit':
+        # "10/minute", "100/hour", "3/second"
+        attempts, _, period = value.partition('/')
+        if period not in PERIODS:
+            raise ValueError(f'Invalid rate limit: {value}')
+        return cls(int(attempts), PERIODS[period])
+
+
+class LoginRateLimiter:
+    def __init__(self, store: RateLimitStore, per_ip: RateLimit, per_identifier: RateLimit, enabled: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.store = store
+        self.per_ip = per_ip
+        self.per_identifier = per_identifier
+        self.enabled = enabled
+        self.clock = clock
+        self.allowed = 0
+        self.shed_ip = 0
+        self.shed_identifier = 0
+
+    @classmethod
+    def from_env(cls) -> 'LoginRateLimiter':
+        return cls(
+            InMemoryRateLimitStore(max_keys=int(os.environ.get('LOGIN_RATE_LIMIT_MAX_KEYS', '100000'))),
+            per_ip=RateLimit.parse(os.environ.get('LOGIN_RATE_LIMIT_IP', DEFAULT_IP_LIMIT)),
+            per_identifier=RateLimit.parse(os.environ.get('LOGIN_RATE_LIMIT_IDENTIFIER', DEFAULT_IDENTIFIER_LIMIT)),
+            enabled=os.environ.get('LOGIN_RATE_LIMIT_ENABLED', 'true').lower() in {'1', 'true', 'yes'},
+        )
+
+    async def check(self, client_ip: str, identifier: str) -> None:
+        # Runs before the user lookup and password verify so a shed attempt costs no database or bcrypt time
+        if not self.enabled:
+            return
+        now = self.clock()
+        retry_after = await self.store.take(f'ip:{client_ip}', self.per_ip.capacity, self.per_ip.refill_rate, now)
+        if retry_after:
+            self.shed_ip += 1
+            raise self._too_many_requests(retry_after)
+        retry_after = await self.store.take(f'identifier:{identifier.strip().lower()}', self.per_identifier.capacity, self.per_identifier.refill_rate, now)
+        if retry_after:
+            self.shed_identifier += 1
+            raise self._too_many_requests(retry_after)
+        self.allowed += 1
+
+    def _too_many_requests(self, retry_after: float) -> HTTPException:
+        return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many login attempts, try again later", headers={'Retry-After': str(math.ceil(retry_after))})
+
+    def stats(self) -> dict:
+        return {'allowed': self.allowed, 'shed_ip': self.shed_ip, 'shed_identifier': self.shed_identifier}
+
+
+login_rate_limiter = LoginRateLimiter.from_env()
@@ -0,0 +1,41 @@
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+from backend.database.utils.db_utils import AsyncClient, claim_refresh_token, get_refresh_token, insert_refresh_token, revoke_refresh_tokens
+
+# Refresh tokens are opaque, only their digest is stored so a database leak cannot be replayed
+REFRESH_TOKEN_TTL = timedelta(days=int(os.environ.get('REFRESH_TOKEN_TTL_DAYS', '30')))
+
+
+class RefreshTokenError(Exception):
+    def __init__(self, reason: str, user_id: int | None = None):
+        self.reason = reason
+        self.user_id = user_id
+        super().__init__(reason)
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def issue_refresh_token(db: AsyncClient, user_id: int, family_id: str | None = None) -> str:
+    # Login starts a new family, every rotation continues it
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.now(timezone.utc) + REFRESH_TOKEN_TTL
+    await insert_refresh_token(db, token_hash=hash_refresh_token(token), family_id=family_id or secrets.token_hex(16), user_id=user_id, expires_at=expires_at.isoformat())
+    return token
+
+
+async def rotate_refresh_token(db: AsyncClient, token: str) -> tuple[int, str]:
+    # Returns the user id and the next token of the family, the presented token can never be used again
+    token_hash = hash_refresh_token(token)
+    record = await claim_refresh_token(db, token_hash=token_hash, now=datetime.now(timezone.utc).isoformat())
+    if record is None:
+        stored = await get_refresh_token(db, token_hash=token_hash)
+        if stored is not None and (stored['used_at'] is not None or stored['revoked']):
+            # A used token came back: either it was stolen or the legitimate client's copy was, so end the family
+            await revoke_refresh_tokens(db, family_id=stored['family_id'])
+            raise RefreshTokenError('reused', user_id=stored['user_id'])
+        raise RefreshTokenError('invalid')
+    return record['user_id'], await issue_refresh_token(db, user_id=record['user_id'], family_id=record['family_id'])
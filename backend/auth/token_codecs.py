@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from jose.exceptions import ExpiredSignatureError, JWTError
+
+# Every codec raises jose's JWTError (ExpiredSignatureError for expired tokens) so callers do not depend on the backend
+
+HMAC_DIGESTS = {'HS256': hashlib.sha256, 'HS384': hashlib.sha384, 'HS512': hashlib.sha512}
+
+
+class TokenCodec(ABC):
+    name: str
+    algorithms: frozenset[str]
+
+    @abstractmethod
+    def encode(self, claims: dict, key, algorithm: str, headers: dict | None = None) -> str:
+        # key is the shared secret for HS* algorithms and a cryptography private key otherwise
+        ...
+
+    @abstractmethod
+    def decode(self, token: str, key, algorithm: str) -> dict:
+        # Verifies the signature with exactly `algorithm` and rejects expired tokens
+        ...
+
+    @abstractmethod
+    def unverified_header(self, token: str) -> dict:
+        ...
+
+
+class JoseCodec(TokenCodec):
+    name = 'jose'
+    algorithms = frozenset({'HS256', 'HS384', 'HS512', 'ES256', 'RS256'})
+
+    def __init__(self):
+        self._module = None
+
+    @property
+    def _jwt(self):
+        # jose.jwt loads its crypto backends, so it is imported by the first sign or verify (the startup warmup)
+        # instead of when the app is imported. jose.exceptions above is light.
+        if self._module is None:
+            from jose import jwt
+            self._module = jwt
+        return self._module
+
+    def encode(self, claims: dict, key, algorithm: str, headers: dict | None = None) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key, algorithm: str) -> dict:
+        return self._jwt.decode(token, key, algorithms=[algorithm])
+
+    def unverified_header(self, token: str) -> dict:
+        return self._jwt.get_unverified_header(token)
+
+
+class PyJWTCodec(TokenCodec):
+    name = 'pyjwt'
+    algorithms = frozenset({'HS256', 'HS384', 'HS512', 'ES256', 'RS256', 'EdDSA'})
+
+    def __init__(self):
+        try:
+            import jwt
+        except ImportError:
+            raise RuntimeError('AUTH_TOKEN_CODEC=pyjwt requires the PyJWT package')
+        self._jwt = jwt
+
+    def encode(self, claims: dict, key, algorithm: str, headers: dict | None = None) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key, algorithm: str) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._jwt.ExpiredSignatureError as error:
+            raise ExpiredSignatureError(str(error)) from error
+        except self._jwt.PyJWTError as error:
+            raise JWTError(str(error)) from error
+
+    def unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._jwt.PyJWTError as error:
+            raise JWTError(str(error)) from error
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _numeric_date(value):
+    return int(value.timestamp()) if isinstance(value, datetime) else value
+
+
+class HmacCodec(TokenCodec):
+    # HS256/384/512 straight on hmac and json, without a general purpose JOSE library in the way
+    name = 'hmac'
+    algorithms = frozenset(HMAC_DIGESTS)
+
+    def encode(self, claims: dict, key, algorithm: str, headers: dict | None = None) -> str:
+        header = {'alg': algorithm, 'typ': 'JWT', **(headers or {})}
+        payload = {name: _numeric_date(value) if name in ('exp', 'iat', 'nbf') else value for name, value in claims.items()}
+        signing_input = _b64encode(json.dumps(header, separators=(',', ':')).encode()) + b'.' + _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        signature = hmac.new(key.encode() if isinstance(key, str) else key, signing_input, HMAC_DIGESTS[algorithm]).digest()
+        return (signing_input + b'.' + _b64encode(signature)).decode()
+
+    def decode(self, token: str, key, algorithm: str) -> dict:
+        try:
+            signing_input, _, signature = token.rpartition('.')
+            encoded_header, _, encoded_payload = signing_input.partition('.')
+            header = json.loads(_b64decode(encoded_header))
+            expected = hmac.new(key.encode() if isinstance(key, str) else key, signing_input.encode(), HMAC_DIGESTS[algorithm]).digest()
+            valid = isinstance(header, dict) and header.get('alg') == algorithm and hmac.compare_digest(expected, _b64decode(signature))
+        except (ValueError, UnicodeError):
+            raise JWTError('Malformed token')
+        if not valid:
+            raise JWTError('Signature verification failed')
+        try:
+            payload = json.loads(_b64decode(encoded_payload))
+        except (ValueError, UnicodeError):
+            raise JWTError('Malformed token payload')
+        if not isinstance(payload, dict):
+            raise JWTError('Malformed token payload')
+        now = time.time()
+        expires_at, not_before = payload.get('exp'), payload.get('nbf')
+        if expires_at is not None:
+            if not isinstance(expires_at, (int, float)):
+                raise JWTError('Expiration Time claim (exp) must be a number')
+            if expires_at < now:
+                raise ExpiredSignatureError('Signature has expired')
+        if not_before is not None and (not isinstance(not_before, (int, float)) or not_before > now):
+            raise JWTError('The token is not yet valid (nbf)')
+        return payload
+
+    def unverified_header(self, token: str) -> dict:
+        try:
+            header = json.loads(_b64decode(token.partition('.')[0]))
+        except (ValueError, UnicodeError):
+            raise JWTError('Malformed token header')
+        if not isinstance(header, dict):
+            raise JWTError('Malformed token header')
+        return header
+
+
+CODECS = {'jose': JoseCodec, 'pyjwt': PyJWTCodec, 'hmac': HmacCodec}
+
+
+def get_codec(name: str) -> TokenCodec:
+    if name not in CODECS:
+        raise RuntimeError(f'AUTH_TOKEN_CODEC invalid: {name}')
+    return CODECS[name]()
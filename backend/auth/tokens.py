@@ -0,0 +1,127 @@
+from jose.exceptions import JWTError
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from datetime import datetime, timedelta, timezone
+from backend.auth.token_cache import TokenCache, TokenVersionCache
+from backend.auth.token_codecs import get_codec
+from backend.database.utils.db_utils import AsyncClient, bump_token_version, revoke_refresh_tokens
+from backend.metrics import timed
+from backend.settings import get_settings
+import os
+
+if TYPE_CHECKING:
+    from backend.auth.keys import KeyRing
+
+settings = get_settings()
+SECRET_KEY = settings.auth_hash_key
+ALGORITHM = settings.secret_algorithm
+
+if settings.auth_keys_dir is None and (SECRET_KEY is None or ALGORITHM is None):
+    raise RuntimeError("AUTH_HASH_KEY and SECRET_ALGORITHM must be set in environment")
+
+TOKEN_MODE = settings.auth_token_mode
+
+token_cache = TokenCache(max_size=int(os.environ.get('TOKEN_CACHE_SIZE', '10000')))
+# Claims tokens are answered from their own claims once their `ver` matches this, see get_current_principal
+token_versions = TokenVersionCache(max_size=int(os.environ.get('TOKEN_VERSION_CACHE_SIZE', '10000')), ttl=float(os.environ.get('TOKEN_VERSION_CACHE_TTL', '60')))
+
+codec = get_codec(settings.auth_token_codec)
+
+# With AUTH_KEYS_DIR set tokens are signed with asymmetric keys (ES256/RS256/EdDSA) instead of the shared secret.
+# Any key change empties the token cache so tokens of a removed key stop verifying right away. The key ring and the
+# cryptography package behind it are only imported in that case.
+key_ring: 'KeyRing | None' = None
+if settings.auth_keys_dir:
+    from backend.auth.keys import KeyRing
+    key_ring = KeyRing(settings.auth_keys_dir, reload_interval=settings.auth_keys_reload_interval, on_reload=token_cache.clear, algorithms=codec.algorithms)
+if key_ring is None and ALGORITHM not in codec.algorithms:
+    raise RuntimeError(f'SECRET_ALGORITHM {ALGORITHM} is not supported by the {codec.name} token codec')
+
+
+@dataclass(frozen=True, slots=True)
+class AccessClaims:
+    user_id: int
+    # The user's token_version when the token was minted, the token is revoked once the stored one is higher
+    version: int = 0
+    # Only set on claims-mode tokens
+    username: str | None = None
+    email: str | None = None
+
+def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
+    data_to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.now(timezone.utc) + expires_delta
+    else:
+        expire = datetime.now(timezone.utc) + timedelta(minutes=30)
+    data_to_encode.update({'exp': expire})
+    with timed('jwt.encode'):
+        if key_ring is not None:
+            signing_key = key_ring.active()
+            encoded_jwt = codec.encode(data_to_encode, signing_key.private_key, algorithm=signing_key.algorithm, headers={'kid': signing_key.kid})
+        else:
+            encoded_jwt = codec.encode(data_to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def decode_jwt(token: str) -> dict:
+    if key_ring is None:
+        return codec.decode(token, SECRET_KEY, algorithm=ALGORITHM)
+    verifying_key = key_ring.get(codec.unverified_header(token).get('kid'))
+    if verifying_key is None:
+        raise JWTError('Token signed with an unknown key')
+    return codec.decode(token, verifying_key.public_key, algorithm=verifying_key.algorithm)
+
+def warmup() -> None:
+    # Signs and verifies one throwaway token so the codec, its crypto backend and the signing keys are ready
+    decode_jwt(create_access_token({'sub': '0'}, expires_delta=timedelta(minutes=1)))
+
+def jwks() -> dict:
+    # Public keys only, a shared HMAC secret is never published
+    return key_ring.jwks() if key_ring is not None else {'keys': []}
+
+def access_token_claims(user: dict) -> dict:
+    claims = {'sub': str(user.get('id'))}
+    version = user.get('token_version') or 0
+    if TOKEN_MODE == 'claims':
+        claims.update({'username': user.get('username'), 'email': user.get('email'), 'ver': version})
+    elif version:
+        # Only users whose tokens were revoked need the version, anyone else's tokens stay minimal
+        claims['ver'] = version
+    return claims
+
+def decode_access_claims(token: str) -> AccessClaims:
+    # Raises JWTError or ValueError when the token is invalid. Revocation is checked against the user's
+    # token_version, see get_current_principal
+    if key_ring is not None:
+        # Picks up key changes first, a reload empties the cache of tokens a removed key signed
+        key_ring.refresh()
+    claims = token_cache.get(token)
+    if claims is None:
+        with timed('jwt.decode'):
+            payload = decode_jwt(token)
+        user_id_str: str = payload.get('sub')
+        if user_id_str is None:
+            raise JWTError('Token has no subject')
+        claims = AccessClaims(user_id=int(user_id_str), version=int(payload.get('ver', 0)), username=payload.get('username'), email=payload.get('email'))
+        expires_at = payload.get('exp')
+        if expires_at is not None:
+            token_cache.put(token, claims, float(expires_at))
+    return claims
+
+def decode_access_token(token: str) -> int:
+    return decode_access_claims(token).user_id
+
+async def revoke_user_tokens(db: AsyncClient, user_id: int) -> None:
+    # The version lives in the users table, so every worker rejects the older tokens and a restart keeps them revoked
+    await bump_token_version(db, user_id=user_id)
+    token_cache.invalidate_user(user_id)
+    token_versions.invalidate_user(user_id)
+
+async def revoke_deleted_user_tokens(db: AsyncClient, user_ids: list[int]) -> None:
+    # Every delete path calls this. The missing row already fails each access token check, this drops the
+    # cached tokens and ends the refresh tokens (Postgres cascades the delete, the memory backend does not).
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        token_cache.invalidate_user(user_id)
+        token_versions.invalidate_user(user_id)
+    await revoke_refresh_tokens(db, user_ids=user_ids)
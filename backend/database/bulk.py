@@ -0,0 +1,219 @@
+"""Bulk user import and export.
+
+Streams users in and out of the users table for the current ENV in bounded-memory chunks:
+
+    python -m backend.database.bulk import users.ndjson
+    python -m backend.database.bulk import users.csv --format csv --on-conflict fail
+    python -m backend.database.bulk export users.ndjson --page-size 5000
+
+Import rows carry username, email and either a plaintext `password` (hashed in the password hasher's
+worker pool) or a `password_hash` the current hashing policy already recognises, e.g. a
+`$bcrypt-sha256$` value from an export. Exports write `password_hash`, so they can be re-imported.
+Rows that fail validation, and NDJSON lines that are not a JSON object, are reported with their reason
+and counted as invalid, the rest of the file is still imported.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional, TextIO
+from pydantic import BaseModel, ValidationError
+from backend.auth.hashing import PasswordHasher, password_hasher
+from backend.auth.models.validators import Email, Username
+from backend.database.utils.db_utils import UserConflictError, db_session, get_users_by_identifiers, get_users_page, insert_users
+from backend.database.utils.pool import close_pool
+
+FORMATS = ('ndjson', 'csv')
+CSV_FIELDS = ('username', 'email', 'password_hash')
+
+
+class ImportedUser(BaseModel):
+    username: Username
+    email: Email
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+
+
+class UnreadableRow(dict):
+    # Stands in for an NDJSON line that is not a JSON object, prepare_chunk reports it as invalid and the import goes on
+    def __init__(self, line: int, reason: str):
+        super().__init__(line=line)
+        self.reason = f'line {line}: {reason}'
+
+
+def read_rows(source: TextIO, format: str) -> Iterator[dict]:
+    if format == 'csv':
+        for row in csv.DictReader(source):
+            yield {key: value for key, value in row.items() if value not in (None, '')}
+        return
+    for number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield UnreadableRow(number, f'invalid JSON, {error.msg} at column {error.colno}')
+            continue
+        yield row if isinstance(row, dict) else UnreadableRow(number, 'expected a JSON object')
+
+
+def chunks(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def prepare_chunk(chunk: list[dict], hasher: PasswordHasher, on_error: Callable[[dict, str], None]) -> list[dict]:
+    users, pending = [], []
+    for row in chunk:
+        if isinstance(row, UnreadableRow):
+            on_error(row, row.reason)
+            continue
+        try:
+            user = ImportedUser.model_validate(row)
+        except ValidationError as error:
+            on_error(row, '; '.join(detail['msg'] for detail in error.errors()))
+            continue
+        if user.password_hash is not None:
+            if not hasher.recognizes(user.password_hash):
+                on_error(row, 'password_hash is not in a recognised format')
+                continue
+            users.append({'username': user.username, 'email': user.email.lower(), 'password': user.password_hash})
+        elif user.password is not None:
+            pending.append(user)
+        else:
+            on_error(row, 'password or password_hash is required')
+    # Keeps every worker busy with one job queued behind it, without overrunning the queue and getting shed
+    limit = asyncio.Semaphore(hasher.max_workers + min(hasher.max_workers, hasher.max_queue))
+
+    async def hash_user(user: ImportedUser) -> dict:
+        async with limit:
+            return {'username': user.username, 'email': user.email.lower(), 'password': await hasher.hash(user.password)}
+
+    users.extend(await asyncio.gather(*(hash_user(user) for user in pending)))
+    return users
+
+
+def drop_duplicates(users: list[dict], existing: dict[str, dict], on_error: Callable[[dict, str], None]) -> list[dict]:
+    seen, unique = set(existing), []
+    for user in users:
+        if user['username'] in seen or user['email'] in seen:
+            on_error(user, 'account with that username or email already exists')
+            continue
+        seen.update((user['username'], user['email']))
+        unique.append(user)
+    return unique
+
+
+async def import_users(db, rows: Iterable[dict], chunk_size: int = 500, on_conflict: str = 'skip', hasher: PasswordHasher = password_hasher, on_error: Callable[[dict, str], None] | None = None) -> dict:
+    report = {'inserted': 0, 'skipped': 0, 'invalid': 0}
+
+    def reject(row: dict, reason: str) -> None:
+        report['invalid'] += 1
+        if on_error is not None:
+            on_error(row, reason)
+
+    def skip(row: dict, reason: str) -> None:
+        report['skipped'] += 1
+        if on_error is not None:
+            on_error(row, reason)
+
+    for chunk in chunks(rows, chunk_size):
+        users = await prepare_chunk(chunk, hasher, reject)
+        if not users:
+            continue
+        if on_conflict == 'skip':
+            existing = await get_users_by_identifiers(db, [value for user in users for value in (user['username'], user['email'])])
+            users = drop_duplicates(users, existing, skip)
+        try:
+            created = await insert_users(db, users) if users else []
+        except UserConflictError:
+            if on_conflict != 'skip':
+                raise
+            # Someone registered one of these accounts since the check, fall back to row by row for this chunk
+            created = []
+            for user in users:
+                try:
+                    created.extend(await insert_users(db, [user]))
+                except UserConflictError as conflict:
+                    skip(user, str(conflict))
+        report['inserted'] += len(created)
+    return report
+
+
+async def export_users(db, page_size: int = 1000) -> AsyncIterator[dict]:
+    after_id = 0
+    while True:
+        page = await get_users_page(db, after_id=after_id, page_size=page_size)
+        for user in page:
+            yield {'username': user['username'], 'email': user['email'], 'password_hash': user['password']}
+        if len(page) < page_size:
+            return
+        after_id = page[-1]['id']
+
+
+async def write_rows(rows: AsyncIterator[dict], target: TextIO, format: str) -> int:
+    written = 0
+    writer = csv.DictWriter(target, fieldnames=CSV_FIELDS) if format == 'csv' else None
+    if writer is not None:
+        writer.writeheader()
+    async for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            target.write(json.dumps(row) + '\n')
+        written += 1
+    return written
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help='insert users from a file, - for stdin')
+    importer.add_argument('path')
+    importer.add_argument('--format', choices=FORMATS, default='ndjson')
+    importer.add_argument('--chunk-size', type=int, default=500, help='rows validated, hashed and inserted together')
+    importer.add_argument('--on-conflict', choices=('skip', 'fail'), default='skip', help='what to do with rows whose username or email is taken')
+    exporter = commands.add_parser('export', help='write every user to a file, - for stdout')
+    exporter.add_argument('path')
+    exporter.add_argument('--format', choices=FORMATS, default='ndjson')
+    exporter.add_argument('--page-size', type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    try:
+        async with db_session() as db:
+            if args.command == 'import':
+                def on_error(row: dict, reason: str) -> None:
+                    if isinstance(row, UnreadableRow):
+                        print(reason, file=sys.stderr)
+                    else:
+                        print(f"{row.get('username') or row.get('email') or row}: {reason}", file=sys.stderr)
+                source = sys.stdin if args.path == '-' else open(args.path, newline='')
+                try:
+                    return await import_users(db, read_rows(source, args.format), chunk_size=args.chunk_size, on_conflict=args.on_conflict, on_error=on_error)
+                finally:
+                    if source is not sys.stdin:
+                        source.close()
+            target = sys.stdout if args.path == '-' else open(args.path, 'w', newline='')
+            try:
+                return {'exported': await write_rows(export_users(db, page_size=args.page_size), target, args.format)}
+            finally:
+                if target is not sys.stdout:
+                    target.close()
+    finally:
+        password_hasher.shutdown()
+        await close_pool()
+
+
+def main(argv: list[str] | None = None) -> int:
+    report = asyncio.run(run(parse_args(argv)))
+    print(json.dumps(report), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,32 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Annotated
 from starlette import status
-from backend.database.utils.db_utils import get_db_connection, get_table_by_env
-from supabase import Client
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
+from backend.database.utils.db_utils import AsyncClient, get_db_connection, user_exists, delete_user, delete_user_by_id, get_users_by_identifiers, delete_users_by_identifiers
+from backend.database.models.account_batch import AccountBatchRequest
+from backend.auth.tokens import revoke_deleted_user_tokens
+from backend.settings import get_settings
 
 router = APIRouter(prefix='/api/db', tags=['database'])
 
 @router.get('/accounts/lookup', status_code=status.HTTP_200_OK)
-async def lookup_user(identifier: str, db: Annotated[Client, Depends(get_db_connection)]):
-    if os.environ.get('ENV') not in {'test', 'dev'}:
+async def lookup_user(identifier: str, db: Annotated[AsyncClient, Depends(get_db_connection)]):
+    if get_settings().env not in {'test', 'dev'}:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    users_table = get_table_by_env('users')
-    existing_accounts_response = db.table(users_table).select('id').or_(f"username.eq.{identifier},email.eq.{identifier}").limit(1).execute()
-    return {'found': len(existing_accounts_response.data) > 0 }
+    return {'found': await user_exists(db, identifier=identifier)}
 
 @router.delete('/accounts/delete', status_code=status.HTTP_200_OK)
-async def delete_account(identifier: str, db:Annotated[Client, Depends(get_db_connection)]):
-    if os.environ.get('ENV') not in {'test', 'dev'}:
+async def delete_account(db: Annotated[AsyncClient, Depends(get_db_connection)], identifier: str | None = None, user_id: int | None = None):
+    if get_settings().env not in {'test', 'dev'}:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    users_table = get_table_by_env('users')
-    deletion_response = db.table(users_table).delete().or_(f'username.eq.{identifier},email.eq.{identifier}').execute()
-    if not deletion_response.data:
+    if (identifier is None) == (user_id is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Pass exactly one of identifier or user_id')
+    if user_id is not None:
+        # Primary key delete, the username comes back in the same round-trip
+        deleted_user = await delete_user_by_id(db, user_id=user_id)
+        if deleted_user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        await revoke_deleted_user_tokens(db, [deleted_user['id']])
+        return {'account_identifier': user_id, 'username': deleted_user['username'], 'deletion_successful': True}
+    deleted_user = await delete_user(db, identifier=identifier)
+    if deleted_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    await revoke_deleted_user_tokens(db, [deleted_user['id']])
     return {'account_identifier': identifier, 'deletion_successful': True}
 
+@router.post('/accounts/batch/lookup', status_code=status.HTTP_200_OK)
+async def lookup_users(request: AccountBatchRequest, db: Annotated[AsyncClient, Depends(get_db_connection)]):
+    if get_settings().env not in {'test', 'dev'}:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    found = await get_users_by_identifiers(db, identifiers=request.identifiers)
+    return {'results': [{'identifier': identifier, 'found': identifier in found} for identifier in dict.fromkeys(request.identifiers)]}
 
-    
+@router.post('/accounts/batch/delete', status_code=status.HTTP_200_OK)
+async def delete_accounts(request: AccountBatchRequest, db: Annotated[AsyncClient, Depends(get_db_connection)]):
+    if get_settings().env not in {'test', 'dev'}:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    deleted = await delete_users_by_identifiers(db, identifiers=request.identifiers)
+    await revoke_deleted_user_tokens(db, list({user['id'] for user in deleted.values()}))
+    return {'results': [{'account_identifier': identifier, 'deletion_successful': identifier in deleted} for identifier in dict.fromkeys(request.identifiers)]}
@@ -0,0 +1,13 @@
+-- Registration inserts directly and relies on these constraints to reject duplicates,
+-- the resulting 23505 errors are mapped back to 409 responses in db_utils.insert_user.
+-- Index names match the ones Postgres generates for UNIQUE column constraints, so this
+-- is a no-op on tables that already declare them.
+
+create unique index if not exists users_username_key on users (username);
+create unique index if not exists users_email_key on users (email);
+
+create unique index if not exists users_dev_username_key on users_dev (username);
+create unique index if not exists users_dev_email_key on users_dev (email);
+
+create unique index if not exists users_test_username_key on users_test (username);
+create unique index if not exists users_test_email_key on users_test (email);
@@ -0,0 +1,37 @@
+-- Refresh tokens are opaque random strings, only their sha256 is stored. Every token belongs to a
+-- family started at login; refreshing marks the token used and issues the next one in the family.
+-- Presenting a used token again revokes the whole family (see backend/auth/refresh_tokens.py).
+-- Deleting a user cascades to their tokens.
+
+create table if not exists refresh_tokens (
+    token_hash text primary key,
+    family_id text not null,
+    user_id bigint not null references users (id) on delete cascade,
+    expires_at timestamptz not null,
+    used_at timestamptz,
+    revoked boolean not null default false
+);
+create index if not exists refresh_tokens_family_id_idx on refresh_tokens (family_id);
+create index if not exists refresh_tokens_user_id_idx on refresh_tokens (user_id);
+
+create table if not exists refresh_tokens_dev (
+    token_hash text primary key,
+    family_id text not null,
+    user_id bigint not null references users_dev (id) on delete cascade,
+    expires_at timestamptz not null,
+    used_at timestamptz,
+    revoked boolean not null default false
+);
+create index if not exists refresh_tokens_dev_family_id_idx on refresh_tokens_dev (family_id);
+create index if not exists refresh_tokens_dev_user_id_idx on refresh_tokens_dev (user_id);
+
+create table if not exists refresh_tokens_test (
+    token_hash text primary key,
+    family_id text not null,
+    user_id bigint not null references users_test (id) on delete cascade,
+    expires_at timestamptz not null,
+    used_at timestamptz,
+    revoked boolean not null default false
+);
+create index if not exists refresh_tokens_test_family_id_idx on refresh_tokens_test (family_id);
+create index if not exists refresh_tokens_test_user_id_idx on refresh_tokens_test (user_id);
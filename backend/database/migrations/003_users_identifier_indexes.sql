@@ -0,0 +1,37 @@
+-- Lookups no longer OR across username and email: db_utils.classify_identifier routes an identifier
+-- containing '@' to `email = lower(identifier)` and anything else to `username = identifier`, so every
+-- lookup is one equality on one unique index. That needs emails stored lowercased.
+--
+-- The update fails with 23505 if two accounts differ only in the case of their email, find them first with
+--   select lower(email), array_agg(id) from users group by 1 having count(*) > 1;
+-- The check constraints keep new rows lowercased, the application lowercases on insert as well.
+-- The indexes are the ones 001 creates and are no-ops where they already exist.
+
+update users set email = lower(email) where email <> lower(email);
+update users_dev set email = lower(email) where email <> lower(email);
+update users_test set email = lower(email) where email <> lower(email);
+
+do $$
+declare
+    users_table text;
+begin
+    foreach users_table in array array['users', 'users_dev', 'users_test'] loop
+        if not exists (select 1 from pg_constraint where conname = users_table || '_email_lowercase') then
+            execute format('alter table %I add constraint %I check (email = lower(email))', users_table, users_table || '_email_lowercase');
+        end if;
+    end loop;
+end
+$$;
+
+create unique index if not exists users_username_key on users (username);
+create unique index if not exists users_email_key on users (email);
+
+create unique index if not exists users_dev_username_key on users_dev (username);
+create unique index if not exists users_dev_email_key on users_dev (email);
+
+create unique index if not exists users_test_username_key on users_test (username);
+create unique index if not exists users_test_email_key on users_test (email);
+
+analyze users;
+analyze users_dev;
+analyze users_test;
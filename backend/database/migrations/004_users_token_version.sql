@@ -0,0 +1,8 @@
+-- Access tokens carry the user's token_version as their `ver` claim and are rejected once the stored
+-- version is higher (backend/auth/dependencies.py). Presenting a used refresh token bumps it, which
+-- revokes every access token issued before, on every worker and across restarts.
+-- Existing rows start at 0, the version tokens without a `ver` claim have.
+
+alter table users add column if not exists token_version integer not null default 0;
+alter table users_dev add column if not exists token_version integer not null default 0;
+alter table users_test add column if not exists token_version integer not null default 0;
@@ -0,0 +1,4 @@
+from pydantic import BaseModel, Field
+
+class AccountBatchRequest(BaseModel):
+    identifiers: list[str] = Field(min_length=1, max_length=1000)
@@ -11,4 +11,34 @@ class UserResponse(BaseModel):
     id: int
     username: str
     email: EmailStr
-    is_active: bool = True
\ No newline at end of file
+    is_active: bool = True
+
+class UserRow:
+    # A profile read from our own users table. The database already enforces the constraints UserResponse
+    # checks, so rows are taken as they are instead of being validated again on every request
+    __slots__ = ('id', 'username', 'email', 'is_active', 'token_version')
+
+    def __init__(self, id: int, username: str, email: str, is_active: bool = True, token_version: int = 0):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.is_active = is_active
+        # Access tokens minted with a lower version have been revoked
+        self.token_version = token_version
+
+    @classmethod
+    def from_row(cls, row: dict) -> 'UserRow':
+        return cls(row['id'], row['username'], row['email'], row.get('is_active', True), row.get('token_version') or 0)
+
+    def model_dump(self) -> dict:
+        # The public profile, as UserResponse describes it
+        return {'id': self.id, 'username': self.username, 'email': self.email, 'is_active': self.is_active}
+
+    def to_row(self) -> dict:
+        return {**self.model_dump(), 'token_version': self.token_version}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, UserRow) and self.model_dump() == other.model_dump()
+
+    def __repr__(self) -> str:
+        return f'UserRow(id={self.id!r}, username={self.username!r}, email={self.email!r})'
@@ -1,43 +1,289 @@
-import os 
-from supabase import create_client, Client
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator
+from fastapi import HTTPException
+from starlette import status
+from backend.database.utils.pool import get_pool, PoolTimeoutError, PoolClosedError
+from backend.database.utils.memory_client import get_memory_client, uses_memory_backend
+from backend.database.utils.user_cache import user_cache
+from backend.database.utils.single_flight import user_lookups
+from backend.database.models.user import UserRow
+from backend.metrics import instrumented
+from backend.settings import get_settings
 
-def get_db_connection() -> Client: 
-    db_url: str = os.environ.get("SUPABASE_DB_URL")
-    db_key: str = os.environ.get("SUPABASE_SECRET_KEY")
-    if db_url is None or db_key is None:
-        raise Exception("Database URL or Key not found in environment variables")
-    db: Client = create_client(db_url, db_key)
-    return db
+if TYPE_CHECKING:
+    from postgrest.exceptions import APIError
+    from supabase import AsyncClient
+else:
+    # supabase's full client (auth, realtime, storage) is only imported by the pool, when a real database is used
+    AsyncClient = Any
 
-def get_user(db: Client, identifier: str) -> dict | None:
-    users_table = get_table_by_env('users')
-    response = db.table(users_table).select('id,username,email,password').or_(f"username.eq.{identifier},email.eq.{identifier}").limit(1).execute()
+UNIQUE_VIOLATION = '23505'
+# Identifiers per batch query, keeps the in.(...) list well under URL limits
+BATCH_CHUNK_SIZE = int(os.environ.get('ACCOUNT_BATCH_CHUNK_SIZE', '100'))
+# Columns per use case: only a password check reads the hash, everything that shows or signs a profile reads PROFILE_COLUMNS.
+# Both carry token_version, the revocation counter access tokens are minted with and checked against (migration 004).
+CREDENTIAL_COLUMNS = 'id,username,email,password,token_version'
+PROFILE_COLUMNS = 'id,username,email,token_version'
+
+def api_error() -> type[Exception]:
+    # postgrest's APIError, imported once a write fails: an except clause only evaluates its type when an exception
+    # reaches it, so importing the app never loads postgrest and httpx
+    from postgrest.exceptions import APIError
+    return APIError
+
+class UserConflictError(Exception):
+    def __init__(self, field: str | None = None):
+        # field is None when the database did not say which unique column was violated
+        self.field = field
+        super().__init__(f'Account with that {field} already exists' if field else 'Account already exists')
+
+def conflicting_field(error: 'APIError') -> str | None:
+    if error.code != UNIQUE_VIOLATION:
+        return None
+    # Postgres reports the violated key as "Key (username)=(...) already exists." and names the constraint in the message
+    for field in ('username', 'email'):
+        if f'({field})' in (error.details or ''):
+            return field
+    for field in ('username', 'email'):
+        if f'_{field}_' in (error.message or ''):
+            return field
+    return None
+
+def classify_identifier(identifier: str) -> tuple[str, str]:
+    # Usernames cannot contain '@', so every lookup is one equality on a single unique index instead of an OR
+    # across both columns. Emails are stored lowercased (migration 003), usernames exactly as registered.
+    if '@' in identifier:
+        return 'email', identifier.lower()
+    return 'username', identifier
+
+async def get_db_connection() -> AsyncIterator[AsyncClient]:
+    if uses_memory_backend():
+        yield get_memory_client()
+        return
+    pool = await get_pool()
+    try:
+        db: AsyncClient = await pool.acquire()
+    except (PoolTimeoutError, PoolClosedError):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable, try again later")
+    try:
+        yield db
+    finally:
+        await pool.release(db)
+
+# For work outside a request, e.g. background tasks that run after the request's own lease is released
+db_session = asynccontextmanager(get_db_connection)
+
+async def _first_row(query) -> dict | None:
+    response = await query.limit(1).execute()
     if len(response.data) == 0:
         return None
     return response.data[0]
 
-def get_user_by_id(db: Client, user_id: int) -> dict | None:
+
+async def _find_user(db: AsyncClient, column: str, value: Any, columns: str) -> dict | None:
+    users_table = get_table_by_env('users')
+    if 'password' in columns.split(','):
+        # Credential reads are never shared, a login right after a register or a rehash must not join a query that started before the write
+        return await _first_row(db.table(users_table).select(columns).eq(column, value))
+    # Identical concurrent profile lookups (client retries, several tabs) share one query, each caller gets its own copy of the row
+    # The query runs on the first caller's client without a lease of its own. Leases are multiplexed and releasing one only frees
+    # the slot, so the client stays usable if that caller is cancelled and returns it before the shared query finishes
+    user = await user_lookups.do((users_table, column, value, columns), lambda: _first_row(db.table(users_table).select(columns).eq(column, value)))
+    return None if user is None else dict(user)
+
+@instrumented('db.get_user')
+async def get_user(db: AsyncClient, identifier: str, columns: str = CREDENTIAL_COLUMNS) -> dict | None:
+    column, value = classify_identifier(identifier)
+    return await _find_user(db, column, value, columns)
+
+@instrumented('db.get_user_by_id')
+async def get_user_by_id(db: AsyncClient, user_id: int, columns: str = CREDENTIAL_COLUMNS) -> dict | None:
+    return await _find_user(db, 'id', user_id, columns)
+
+async def get_user_profile(db: AsyncClient, user_id: int) -> UserRow | None:
     users_table = get_table_by_env('users')
-    response = db.table(users_table).select('id,username,email,password').eq('id', user_id).limit(1).execute()
+    return await user_cache.get_or_load(users_table, user_id, lambda: get_user_by_id(db, user_id=user_id, columns=PROFILE_COLUMNS))
+
+@instrumented('db.user_exists')
+async def user_exists(db: AsyncClient, identifier: str) -> bool:
+    users_table = get_table_by_env('users')
+    column, value = classify_identifier(identifier)
+    response = await db.table(users_table).select('id').eq(column, value).limit(1).execute()
+    return len(response.data) > 0
+
+@instrumented('db.insert_user')
+async def insert_user(db: AsyncClient, username: str, email: str, password_hash: str) -> dict | None:
+    # Uniqueness is enforced by the table's unique constraints so the check and insert are one round-trip
+    users_table = get_table_by_env('users')
+    try:
+        response = await db.table(users_table).insert({'username': username, 'password': password_hash, 'email': email.lower()}).execute()
+    except api_error() as error:
+        if error.code != UNIQUE_VIOLATION:
+            raise
+        raise UserConflictError(conflicting_field(error)) from error
     if len(response.data) == 0:
         return None
+    await user_cache.invalidate(users_table, response.data[0]['id'])
     return response.data[0]
 
-def user_exists(db: Client, identifier: str) -> bool:
+@instrumented('db.insert_users')
+async def insert_users(db: AsyncClient, users: list[dict]) -> list[dict]:
+    # A single INSERT for the whole batch, so either every row lands or a conflict rejects all of them
+    users_table = get_table_by_env('users')
+    try:
+        response = await db.table(users_table).insert([{**user, 'email': user['email'].lower()} for user in users]).execute()
+    except api_error() as error:
+        if error.code != UNIQUE_VIOLATION:
+            raise
+        raise UserConflictError(conflicting_field(error)) from error
+    for created_user in response.data:
+        await user_cache.invalidate(users_table, created_user['id'])
+    return response.data
+
+@instrumented('db.get_users_page')
+async def get_users_page(db: AsyncClient, after_id: int, page_size: int) -> list[dict]:
+    # Keyset pagination: every page is an index range scan on id, however deep into the table it is
     users_table = get_table_by_env('users')
-    response = db.table(users_table).select('id').or_(f"username.eq.{identifier},email.eq.{identifier}").limit(1).execute()
+    response = await db.table(users_table).select('id,username,email,password').gt('id', after_id).order('id').limit(page_size).execute()
+    return response.data
+
+@instrumented('db.update_user_password')
+async def update_user_password(db: AsyncClient, user_id: int, password_hash: str) -> bool:
+    users_table = get_table_by_env('users')
+    response = await db.table(users_table).update({'password': password_hash}).eq('id', user_id).execute()
     return len(response.data) > 0
 
+@instrumented('db.bump_token_version')
+async def bump_token_version(db: AsyncClient, user_id: int) -> None:
+    # Compare-and-set, PostgREST cannot express token_version = token_version + 1. Losing the race means another
+    # request bumped the version, which revokes the same tokens.
+    users_table = get_table_by_env('users')
+    response = await db.table(users_table).select('token_version').eq('id', user_id).limit(1).execute()
+    if len(response.data) == 0:
+        return
+    current = response.data[0]['token_version'] or 0
+    await db.table(users_table).update({'token_version': current + 1}).eq('id', user_id).eq('token_version', current).execute()
+    await user_cache.invalidate(users_table, user_id)
+
+def quote_filter_value(value: str) -> str:
+    # Quoted PostgREST values cannot break out of an in.(...) list with commas or parentheses
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+def in_list(values: list[str]) -> str:
+    return f"({','.join(quote_filter_value(value) for value in values)})"
+
+def route_identifiers(identifiers: list[str]) -> dict[str, tuple[str, str]]:
+    return {identifier: classify_identifier(identifier) for identifier in identifiers}
+
+def column_chunks(routes: dict[str, tuple[str, str]]) -> list[tuple[str, list[str]]]:
+    # Usernames and emails go to their own in.(...) queries, each one a scan of a single unique index
+    values: dict[str, dict[str, None]] = {'username': {}, 'email': {}}
+    for column, value in routes.values():
+        values[column][value] = None
+    return [(column, chunk) for column, column_values in values.items() for chunk in chunked(list(column_values), BATCH_CHUNK_SIZE)]
+
+def chunked(values: list[str], size: int) -> list[list[str]]:
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+def match_identifiers(routes: dict[str, tuple[str, str]], rows: list[dict]) -> dict[str, dict]:
+    by_route = {}
+    for row in rows:
+        by_route.setdefault(('username', row['username']), row)
+        by_route.setdefault(('email', row['email']), row)
+    return {identifier: by_route[route] for identifier, route in routes.items() if route in by_route}
+
+@instrumented('db.get_users_by_identifiers')
+async def get_users_by_identifiers(db: AsyncClient, identifiers: list[str]) -> dict[str, dict]:
+    # One query per column and chunk for the whole batch, keyed back to whichever identifier matched
+    users_table = get_table_by_env('users')
+    routes = route_identifiers(identifiers)
+    responses = await asyncio.gather(*(
+        db.table(users_table).select('id,username,email').filter(column, 'in', in_list(chunk)).execute()
+        for column, chunk in column_chunks(routes)
+    ))
+    return match_identifiers(routes, [row for response in responses for row in response.data])
+
+@instrumented('db.delete_users_by_identifiers')
+async def delete_users_by_identifiers(db: AsyncClient, identifiers: list[str]) -> dict[str, dict]:
+    users_table = get_table_by_env('users')
+    routes = route_identifiers(identifiers)
+    deleted = []
+    for column, chunk in column_chunks(routes):
+        response = await db.table(users_table).delete().filter(column, 'in', in_list(chunk)).select('id,username,email').execute()
+        deleted.extend(response.data)
+    for deleted_user in deleted:
+        await user_cache.invalidate(users_table, deleted_user['id'])
+    return match_identifiers(routes, deleted)
+
+@instrumented('db.insert_refresh_token')
+async def insert_refresh_token(db: AsyncClient, token_hash: str, family_id: str, user_id: int, expires_at: str) -> None:
+    refresh_tokens_table = get_table_by_env('refresh_tokens')
+    await db.table(refresh_tokens_table).insert({'token_hash': token_hash, 'family_id': family_id, 'user_id': user_id, 'expires_at': expires_at, 'revoked': False}).execute()
+
+@instrumented('db.claim_refresh_token')
+async def claim_refresh_token(db: AsyncClient, token_hash: str, now: str) -> dict | None:
+    # Compare-and-set in one UPDATE: only the first caller to present an unused, unexpired token gets the row back
+    refresh_tokens_table = get_table_by_env('refresh_tokens')
+    response = await db.table(refresh_tokens_table).update({'used_at': now}).eq('token_hash', token_hash).is_('used_at', None).is_('revoked', False).gt('expires_at', now).execute()
+    if len(response.data) == 0:
+        return None
+    return response.data[0]
+
+@instrumented('db.get_refresh_token')
+async def get_refresh_token(db: AsyncClient, token_hash: str) -> dict | None:
+    refresh_tokens_table = get_table_by_env('refresh_tokens')
+    response = await db.table(refresh_tokens_table).select('family_id,user_id,expires_at,used_at,revoked').eq('token_hash', token_hash).limit(1).execute()
+    if len(response.data) == 0:
+        return None
+    return response.data[0]
+
+@instrumented('db.revoke_refresh_tokens')
+async def revoke_refresh_tokens(db: AsyncClient, family_id: str | None = None, user_id: int | None = None, user_ids: list[int] | None = None) -> None:
+    refresh_tokens_table = get_table_by_env('refresh_tokens')
+    query = db.table(refresh_tokens_table).update({'revoked': True})
+    if family_id is not None:
+        query = query.eq('family_id', family_id)
+    elif user_ids is not None:
+        query = query.filter('user_id', 'in', f"({','.join(str(int(user_id)) for user_id in user_ids)})")
+    else:
+        query = query.eq('user_id', user_id)
+    await query.execute()
+
+@lru_cache(maxsize=None)
 def get_table_by_env(table: str) -> str:
-    envs = {'dev', 'test', 'prod'}
-    environment = os.environ.get('ENV')
-    if environment not in envs:
+    # Resolved once per table name, every query asks
+    environment = get_settings().env
+    if environment is None:
         raise RuntimeError(f'ENV invalid: {environment}')
     if environment == 'prod':
         return table
-    return f'{table}_{environment}' 
+    return f'{table}_{environment}'
 
-def delete_user(db: Client, identifier: str) -> bool:
+@instrumented('db.delete_user')
+async def delete_user(db: AsyncClient, identifier: str) -> dict | None:
     users_table = get_table_by_env('users')
-    response = db.table(users_table).delete().or_(f"username.eq.{identifier},email.eq.{identifier}").execute()
-    return len(response.data) > 0
+    column, value = classify_identifier(identifier)
+    response = await db.table(users_table).delete().eq(column, value).select('id,username').execute()
+    for deleted_user in response.data:
+        await user_cache.invalidate(users_table, deleted_user['id'])
+    if len(response.data) == 0:
+        return None
+    return response.data[0]
+
+@instrumented('db.delete_user_by_id')
+async def delete_user_by_id(db: AsyncClient, user_id: int, token_version: int | None = None) -> dict | None:
+    # DELETE ... WHERE id = ? RETURNING id, username: a primary key delete that reports who it removed in the same round-trip.
+    # With token_version the row only matches while the caller's access token is unrevoked.
+    users_table = get_table_by_env('users')
+    query = db.table(users_table).delete().eq('id', user_id)
+    if token_version is not None:
+        query = query.lte('token_version', token_version)
+    response = await query.select('id,username').execute()
+    if len(response.data) == 0:
+        return None
+    await user_cache.invalidate(users_table, user_id)
+    return response.data[0]
@@ -0,0 +1,297 @@
+import copy
+import itertools
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+from backend.settings import get_settings
+
+# In-process stand-in for the subset of supabase's AsyncClient query builder the backend uses.
+# Tables behave like the real users tables: serial ids and unique username/email columns.
+
+UNIQUE_COLUMNS = ('username', 'email')
+# Column defaults per table, keyed by the name without its _dev/_test suffix
+COLUMN_DEFAULTS = {'users': {'token_version': 0}}
+
+
+def _api_error(error: dict) -> Exception:
+    # Raised as postgrest's APIError like the real client. postgrest (and httpx under it) is only imported
+    # once a query fails, not when the app is imported
+    from postgrest.exceptions import APIError
+    return APIError(error)
+
+
+@dataclass
+class MemoryResponse:
+    data: list[dict]
+    count: int | None = None
+
+
+def _split_top_level(expression: str) -> list[str]:
+    # Splits a PostgREST logic expression on commas that are not inside quotes or parentheses
+    parts, current, depth, quoted, escaped = [], [], 0, False, False
+    for char in expression:
+        if escaped:
+            escaped = False
+        elif char == '\\' and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _coerce(stored: Any, value: Any) -> Any:
+    # PostgREST filters arrive as strings, compare them the way Postgres would cast them
+    if isinstance(stored, bool) or stored is None or isinstance(value, type(stored)):
+        return value
+    try:
+        return type(stored)(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _predicate(column: str, operator: str, value: Any) -> Callable[[dict], bool]:
+    if operator == 'eq':
+        return lambda row: row.get(column) is not None and row.get(column) == _coerce(row.get(column), value)
+    if operator == 'neq':
+        return lambda row: row.get(column) != _coerce(row.get(column), value)
+    if operator == 'gt':
+        return lambda row: row.get(column) is not None and row.get(column) > _coerce(row.get(column), value)
+    if operator == 'gte':
+        return lambda row: row.get(column) is not None and row.get(column) >= _coerce(row.get(column), value)
+    if operator == 'lt':
+        return lambda row: row.get(column) is not None and row.get(column) < _coerce(row.get(column), value)
+    if operator == 'lte':
+        return lambda row: row.get(column) is not None and row.get(column) <= _coerce(row.get(column), value)
+    if operator == 'in':
+        values = list(value)
+        return lambda row: row.get(column) is not None and row.get(column) in [_coerce(row.get(column), item) for item in values]
+    if operator == 'is':
+        expected = {'null': None, 'true': True, 'false': False}[str(value).lower()]
+        return lambda row: row.get(column) is expected
+    raise _api_error({'code': 'PGRST100', 'message': f'unsupported operator {operator}', 'details': None, 'hint': None})
+
+
+def _parse_condition(condition: str) -> Callable[[dict], bool]:
+    if condition.startswith(('or(', 'and(')):
+        combinator, _, body = condition.partition('(')
+        predicates = [_parse_condition(part) for part in _split_top_level(body[:-1])]
+        if combinator == 'or':
+            return lambda row: any(predicate(row) for predicate in predicates)
+        return lambda row: all(predicate(row) for predicate in predicates)
+    column, operator, value = condition.split('.', 2)
+    if operator == 'in':
+        return _predicate(column, 'in', [_unquote(item) for item in _split_top_level(value[1:-1])])
+    return _predicate(column, operator, _unquote(value))
+
+
+@dataclass
+class MemoryTable:
+    name: str = ''
+    rows: list[dict] = field(default_factory=list)
+    ids: Any = field(default_factory=lambda: itertools.count(1))
+
+    def check_unique(self, row: dict, ignore: dict | None = None) -> None:
+        for column in UNIQUE_COLUMNS:
+            if column not in row:
+                continue
+            for existing in self.rows:
+                if existing is not ignore and existing.get(column) == row[column]:
+                    raise _api_error({
+                        'code': '23505',
+                        'message': f'duplicate key value violates unique constraint "{self.name}_{column}_key"',
+                        'details': f'Key ({column})=({row[column]}) already exists.',
+                        'hint': None,
+                    })
+
+
+class MemoryQuery:
+    def __init__(self, client: 'MemoryClient', table: str):
+        self._client = client
+        self._table = table
+        self._method = 'select'
+        self._columns: list[str] | None = None
+        self._payload: list[dict] | dict | None = None
+        self._filters: list[Callable[[dict], bool]] = []
+        self._plan: list[tuple[str, str]] = []
+        self._order: tuple[str, bool] | None = None
+        self._limit: int | None = None
+
+    def select(self, *columns: str, count: str | None = None) -> 'MemoryQuery':
+        selected = ','.join(columns)
+        self._columns = None if selected in ('', '*') else [column.strip() for column in selected.split(',')]
+        return self
+
+    def insert(self, payload: dict | list[dict], **kwargs) -> 'MemoryQuery':
+        self._method, self._payload = 'insert', payload
+        return self
+
+    def update(self, payload: dict, **kwargs) -> 'MemoryQuery':
+        self._method, self._payload = 'update', payload
+        return self
+
+    def delete(self, **kwargs) -> 'MemoryQuery':
+        self._method = 'delete'
+        return self
+
+    def eq(self, column: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'eq', value))
+        self._plan.append(('eq', column))
+        return self
+
+    def neq(self, column: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'neq', value))
+        self._plan.append(('neq', column))
+        return self
+
+    def gt(self, column: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'gt', value))
+        self._plan.append(('gt', column))
+        return self
+
+    def gte(self, column: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'gte', value))
+        self._plan.append(('gte', column))
+        return self
+
+    def lt(self, column: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'lt', value))
+        self._plan.append(('lt', column))
+        return self
+
+    def lte(self, column: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'lte', value))
+        self._plan.append(('lte', column))
+        return self
+
+    def in_(self, column: str, values: list) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'in', values))
+        self._plan.append(('in', column))
+        return self
+
+    def is_(self, column: str, value: Any) -> 'MemoryQuery':
+        self._filters.append(_predicate(column, 'is', 'null' if value is None else value))
+        self._plan.append(('is', column))
+        return self
+
+    def or_(self, filters: str) -> 'MemoryQuery':
+        self._filters.append(_parse_condition(f'or({filters})'))
+        self._plan.append(('or', filters))
+        return self
+
+    def filter(self, column: str, operator: str, criteria: str) -> 'MemoryQuery':
+        self._filters.append(_parse_condition(f'{column}.{operator}.{criteria}'))
+        self._plan.append((operator, column))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> 'MemoryQuery':
+        self._order = (column, desc)
+        return self
+
+    def limit(self, size: int) -> 'MemoryQuery':
+        self._limit = size
+        return self
+
+    def _project(self, rows: list[dict]) -> list[dict]:
+        if self._columns is None:
+            return [copy.deepcopy(row) for row in rows]
+        return [{column: copy.deepcopy(row.get(column)) for column in self._columns} for row in rows]
+
+    def _matching(self, table: MemoryTable) -> list[dict]:
+        rows = [row for row in table.rows if all(predicate(row) for predicate in self._filters)]
+        if self._order is not None:
+            column, desc = self._order
+            rows.sort(key=lambda row: row.get(column), reverse=desc)
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return rows
+
+    async def execute(self) -> MemoryResponse:
+        self._client.executed.append((self._table, self._method))
+        self._client.plans.append((self._table, self._method, tuple(self._plan)))
+        table = self._client.get_table(self._table)
+        if self._method == 'insert':
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            defaults = COLUMN_DEFAULTS.get(re.sub(r'_(dev|test)$', '', self._table), {})
+            created = [{'id': next(table.ids), **defaults, **copy.deepcopy(values)} for values in payload]
+            # Like a single INSERT statement, either every row lands or none do
+            staged = MemoryTable(name=table.name, rows=list(table.rows))
+            for row in created:
+                staged.check_unique(row)
+                staged.rows.append(row)
+            table.rows.extend(created)
+            return MemoryResponse(data=self._project(created))
+        rows = self._matching(table)
+        if self._method == 'update':
+            for row in rows:
+                table.check_unique(self._payload, ignore=row)
+            for row in rows:
+                row.update(copy.deepcopy(self._payload))
+        elif self._method == 'delete':
+            deleted = {id(row) for row in rows}
+            table.rows[:] = [row for row in table.rows if id(row) not in deleted]
+        return MemoryResponse(data=self._project(rows))
+
+
+class MemoryClient:
+    def __init__(self):
+        self.tables: dict[str, MemoryTable] = {}
+        self.executed: list[tuple[str, str]] = []
+        # (table, method, ((operator, column), ...)) per query, the WHERE clause each query would send
+        self.plans: list[tuple[str, str, tuple[tuple[str, str], ...]]] = []
+
+    def get_table(self, name: str) -> MemoryTable:
+        if name not in self.tables:
+            self.tables[name] = MemoryTable(name=name)
+        return self.tables[name]
+
+    def table(self, name: str) -> MemoryQuery:
+        return MemoryQuery(self, name)
+
+    def reset(self) -> None:
+        self.tables.clear()
+        self.executed.clear()
+        self.plans.clear()
+
+
+_memory_client: MemoryClient | None = None
+
+
+def uses_memory_backend() -> bool:
+    # SUPABASE_BACKEND=memory swaps the pooled supabase clients for one shared in-process database
+    return get_settings().supabase_backend == 'memory'
+
+
+def get_memory_client() -> MemoryClient:
+    global _memory_client
+    if _memory_client is None:
+        _memory_client = MemoryClient()
+    return _memory_client
+
+
+@contextmanager
+def isolated_memory_client() -> Iterator[MemoryClient]:
+    # Swaps in an empty database for the duration, e.g. for a benchmark running inside the test process.
+    # Everything that opens its own session (db_session, e.g. the background password rehash) sees the same one.
+    global _memory_client
+    previous, _memory_client = _memory_client, MemoryClient()
+    try:
+        yield _memory_client
+    finally:
+        _memory_client = previous
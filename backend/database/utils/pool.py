@@ -0,0 +1,224 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable
+from backend.settings import get_settings
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+else:
+    AsyncClient = Any
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class PoolClosedError(Exception):
+    pass
+
+
+class _PooledClient:
+    def __init__(self, client: AsyncClient):
+        self.client = client
+        self.leases = 0
+        self.last_used = time.monotonic()
+        # Out of rotation while a health check pings or replaces it
+        self.checking = False
+
+
+class ClientPool:
+    # Async clients multiplex many requests over their keep-alive connections, so a checkout leases a
+    # client rather than taking it exclusively. Each client serves at most max_leases requests at once.
+    def __init__(self, client_factory: Callable[[], Awaitable[AsyncClient]], ping: Callable[[AsyncClient], Awaitable[None]] | None = None, size: int = 4, max_leases: int = 50, checkout_timeout: float = 5.0, health_check_interval: float = 30.0):
+        if size < 1 or max_leases < 1:
+            raise ValueError('Pool size and max leases must be at least 1')
+        self.size = size
+        self.max_leases = max_leases
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._client_factory = client_factory
+        self._ping = ping
+        self._clients: list[_PooledClient] = []
+        self._closed = False
+        self._available = asyncio.Condition()
+
+    async def open(self) -> 'ClientPool':
+        while len(self._clients) < self.size:
+            self._clients.append(_PooledClient(await self._client_factory()))
+        return self
+
+    async def _is_healthy(self, client: AsyncClient) -> bool:
+        if self._ping is None:
+            return True
+        try:
+            await self._ping(client)
+        except Exception:
+            return False
+        return True
+
+    async def _replace(self, pooled: _PooledClient) -> None:
+        await close_client(pooled.client)
+        pooled.client = await self._client_factory()
+        pooled.last_used = time.monotonic()
+
+    def _least_loaded(self) -> _PooledClient | None:
+        candidates = [pooled for pooled in self._clients if not pooled.checking and pooled.leases < self.max_leases]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda pooled: pooled.leases)
+
+    async def _check(self, pooled: _PooledClient) -> bool:
+        # Runs outside the lock with the client marked as checking, so no other checkout can be handed
+        # the client while it is pinged or replaced and none of them waits behind the round trip
+        try:
+            if await self._is_healthy(pooled.client):
+                return False
+            await self._replace(pooled)
+            return True
+        finally:
+            async with self._available:
+                pooled.checking = False
+                self._available.notify_all()
+
+    async def acquire(self, timeout: float | None = None) -> AsyncClient:
+        if self._closed:
+            raise PoolClosedError('Database client pool is closed')
+        async with self._available:
+            try:
+                await asyncio.wait_for(self._available.wait_for(lambda: self._closed or self._least_loaded() is not None), self.checkout_timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                raise PoolTimeoutError(f'No database client available after {self.checkout_timeout}s')
+            if self._closed:
+                raise PoolClosedError('Database client pool is closed')
+            pooled = self._least_loaded()
+            needs_check = pooled.leases == 0 and time.monotonic() - pooled.last_used >= self.health_check_interval
+            pooled.leases += 1
+            pooled.checking = needs_check
+        if needs_check:
+            try:
+                await self._check(pooled)
+            except BaseException:
+                await self._release(pooled)
+                raise
+        return pooled.client
+
+    async def _release(self, pooled: _PooledClient) -> None:
+        async with self._available:
+            pooled.leases -= 1
+            pooled.last_used = time.monotonic()
+            self._available.notify_all()
+
+    async def release(self, client: AsyncClient) -> None:
+        for pooled in self._clients:
+            if pooled.client is client:
+                await self._release(pooled)
+                return
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncClient]:
+        client = await self.acquire()
+        try:
+            yield client
+        finally:
+            await self.release(client)
+
+    async def health_check(self) -> int:
+        # Pings every idle client and replaces the ones that fail, returns how many were replaced
+        replaced = 0
+        for pooled in list(self._clients):
+            async with self._available:
+                if pooled.leases > 0 or pooled.checking:
+                    continue
+                pooled.checking = True
+            replaced += await self._check(pooled)
+        return replaced
+
+    def stats(self) -> dict:
+        return {'size': self.size, 'max_leases': self.max_leases, 'leased': sum(pooled.leases for pooled in self._clients), 'closed': self._closed}
+
+    async def close(self, drain_timeout: float = 10.0) -> None:
+        # Stop handing out clients, wait for in-flight requests to give theirs back, then close every session
+        async with self._available:
+            self._closed = True
+            self._available.notify_all()
+            try:
+                await asyncio.wait_for(self._available.wait_for(lambda: all(pooled.leases == 0 and not pooled.checking for pooled in self._clients)), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        for pooled in self._clients:
+            await close_client(pooled.client)
+        self._clients.clear()
+
+
+async def close_client(client: AsyncClient) -> None:
+    session = getattr(getattr(client, 'postgrest', None), 'session', None)
+    if session is not None:
+        await session.aclose()
+
+
+async def create_pooled_client() -> AsyncClient:
+    # Imported on first use, importing the app (tests, the memory backend, CLI tools) never pays for supabase or httpx
+    import httpx
+    from supabase import acreate_client, AsyncClientOptions
+    settings = get_settings()
+    db_url = settings.supabase_db_url
+    db_key = settings.supabase_secret_key
+    if db_url is None or db_key is None:
+        raise Exception("Database URL or Key not found in environment variables")
+    max_keepalive = int(os.environ.get('SUPABASE_POOL_MAX_KEEPALIVE', '10'))
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_keepalive, max_keepalive_connections=max_keepalive, keepalive_expiry=float(os.environ.get('SUPABASE_POOL_KEEPALIVE_EXPIRY', '60'))),
+        timeout=float(os.environ.get('SUPABASE_POOL_REQUEST_TIMEOUT', '30')),
+        follow_redirects=True,
+        http2=True,
+    )
+    return await acreate_client(db_url, db_key, options=AsyncClientOptions(httpx_client=http_client))
+
+
+async def ping_client(client: AsyncClient) -> None:
+    from backend.database.utils.db_utils import get_table_by_env
+    await client.table(get_table_by_env('users')).select('id').limit(1).execute()
+
+
+_pool: ClientPool | None = None
+_pool_loop: asyncio.AbstractEventLoop | None = None
+_pool_lock: asyncio.Lock | None = None
+
+
+async def init_pool() -> ClientPool:
+    global _pool, _pool_loop, _pool_lock
+    loop = asyncio.get_running_loop()
+    if _pool_loop is not loop:
+        # httpx connections belong to the loop that opened them, never share a pool across loops
+        _pool, _pool_loop, _pool_lock = None, loop, asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await ClientPool(
+                create_pooled_client,
+                ping=ping_client,
+                size=int(os.environ.get('SUPABASE_POOL_SIZE', '4')),
+                max_leases=int(os.environ.get('SUPABASE_POOL_MAX_LEASES', '50')),
+                checkout_timeout=float(os.environ.get('SUPABASE_POOL_TIMEOUT', '5')),
+                health_check_interval=float(os.environ.get('SUPABASE_POOL_HEALTHCHECK_INTERVAL', '30')),
+            ).open()
+        return _pool
+
+
+def stats() -> dict:
+    # Stats of the current pool, empty until one is opened (never, on the memory backend)
+    return _pool.stats() if _pool is not None else {}
+
+
+async def get_pool() -> ClientPool:
+    if _pool is None or _pool_loop is not asyncio.get_running_loop():
+        return await init_pool()
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close(drain_timeout=float(os.environ.get('SUPABASE_POOL_DRAIN_TIMEOUT', '10')))
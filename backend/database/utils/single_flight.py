@@ -0,0 +1,40 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    # Concurrent calls for the same key share one in-flight call and all get its result or its exception.
+    # Nothing is kept once the call finishes, so a failure is never replayed to later callers.
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        if not self.enabled:
+            return await func()
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        # Shielded so a cancelled caller does not cancel the call the other waiters are sharing
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Marks the exception as retrieved when every waiter was cancelled before it arrived
+            task.exception()
+
+    def stats(self) -> dict:
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._in_flight)}
+
+
+user_lookups = SingleFlight(enabled=os.environ.get('USER_LOOKUP_COALESCING', 'true').lower() in {'1', 'true', 'yes'})
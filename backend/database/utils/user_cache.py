@@ -0,0 +1,92 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+from backend.database.models.user import UserRow
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    # Values are JSON-compatible so a shared store (redis, memcached) can implement the same interface
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        # Returns MISSING when the key is absent or expired
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class InMemoryCacheBackend(CacheBackend):
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        if self.max_size <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class UserCache:
+    # Read-through cache of user profiles by user id, missing ids are cached for negative_ttl
+    def __init__(self, backend: CacheBackend, ttl: float = 60.0, negative_ttl: float = 5.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, namespace: str, user_id: int, loader: Callable[[], Awaitable[dict | None]]) -> UserRow | None:
+        key = f'{namespace}:{user_id}'
+        cached = await self.backend.get(key)
+        if cached is not MISSING:
+            self.hits += 1
+            return None if cached is None else UserRow.from_row(cached)
+        self.misses += 1
+        user = await loader()
+        if user is None:
+            await self.backend.set(key, None, self.negative_ttl)
+            return None
+        # Rows come from our own table, from_row keeps the profile columns and drops anything else
+        user_row = UserRow.from_row(user)
+        await self.backend.set(key, user_row.to_row(), self.ttl)
+        return user_row
+
+    async def invalidate(self, namespace: str, user_id: int) -> None:
+        await self.backend.delete(f'{namespace}:{user_id}')
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+user_cache = UserCache(
+    InMemoryCacheBackend(max_size=int(os.environ.get('USER_CACHE_SIZE', '10000'))),
+    ttl=float(os.environ.get('USER_CACHE_TTL', '60')),
+    negative_ttl=float(os.environ.get('USER_CACHE_NEGATIVE_TTL', '5')),
+)
@@ -0,0 +1,232 @@
+import bisect
+import functools
+import hmac
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Iterable
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from starlette import status
+
+# Read once at import: with metrics off the decorators below return functions untouched and
+# timed() hands back a shared no-op context manager
+ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() in {'1', 'true', 'yes'}
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+_request_stages: ContextVar[list | None] = ContextVar('request_stages', default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        lines.extend(f'{self.name}{_format_labels(key)} {value}' for key, value in self._values.items())
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, (bucket_counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(key + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(key + (("le", "+Inf"),))} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, float]]]] = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple[str, str, float]]]) -> None:
+        # Collectors yield (name, help, value) gauges computed at scrape time, e.g. cache sizes
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, help, value in collector():
+                lines.extend([f'# HELP {name} {help}', f'# TYPE {name} gauge', f'{name} {value}'])
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+stage_duration = registry.histogram('thriftr_stage_duration_seconds', 'Time spent in each instrumented stage of a request')
+request_duration = registry.histogram('thriftr_http_request_duration_seconds', 'HTTP request latency by route')
+requests_total = registry.counter('thriftr_http_requests_total', 'HTTP requests by route and status')
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if not ENABLED:
+        return
+    stage_duration.observe(seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+@contextmanager
+def _timed(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def timed(stage: str):
+    if not ENABLED:
+        return _NOOP
+    return _timed(stage)
+
+
+def instrumented(stage: str):
+    # Decorates an async function so every call is recorded as `stage`, a no-op when metrics are off
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with _timed(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stats_collector(prefix: str, stats: Callable[[], dict]) -> Callable[[], Iterable[tuple[str, str, float]]]:
+    def collect():
+        for key, value in stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f'{prefix}_{key}', f'{prefix} {key}', value
+    return collect
+
+
+def server_timing(stages: list[tuple[str, float]]) -> str:
+    totals: dict[str, float] = {}
+    for stage, seconds in stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ', '.join(f'{stage.replace(".", "-")};dur={seconds * 1000:.2f}' for stage, seconds in totals.items())
+
+
+class MetricsMiddleware:
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        # Stages are only collected per request when they are reported back in a Server-Timing header
+        stages: list[tuple[str, float]] | None = [] if self.server_timing else None
+        token = _request_stages.set(stages)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if stages is not None:
+                    headers = list(message.get('headers', []))
+                    headers.append((b'server-timing', f'{server_timing(stages)}, total;dur={(time.perf_counter() - started) * 1000:.2f}'.lstrip(', ').encode()))
+                    message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
+            route = scope.get('route')
+            labels = {'method': scope['method'], 'route': getattr(route, 'path', 'unmatched'), 'status': str(status_code)}
+            request_duration.observe(time.perf_counter() - started, **labels)
+            requests_total.inc(**labels)
+
+
+def metrics_router(scrape_token: str | None = None) -> APIRouter:
+    # With a scrape token set, /metrics answers only requests that send it as a bearer token
+    router = APIRouter(tags=['metrics'])
+    expected = f'Bearer {scrape_token}'.encode() if scrape_token else None
+
+    @router.get('/metrics', include_in_schema=False)
+    async def metrics(request: Request) -> PlainTextResponse:
+        if expected is not None and not hmac.compare_digest(request.headers.get('authorization', '').encode(), expected):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid metrics token', headers={'WWW-Authenticate': 'Bearer'})
+        return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+    return router
+
+
+def install(app: FastAPI, server_timing: bool = False, serve_endpoint: bool = True, scrape_token: str | None = None) -> None:
+    app.add_middleware(MetricsMiddleware, server_timing=server_timing)
+    if serve_endpoint:
+        app.include_router(metrics_router(scrape_token))
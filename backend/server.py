@@ -0,0 +1,102 @@
+"""Production entry point.
+
+    ENV=prod python -m backend.server
+
+Runs uvicorn with one worker process per available core, uvloop and httptools, and the limits below.
+Every worker runs the app lifespan (database pool, password hasher and JWT key warmup) before it
+accepts connections.
+
+Token revocation is stored in the users table, but some state lives in each worker's memory. With more
+than one worker the server adjusts its defaults for it before the workers start:
+  - the login rate limiter counts per worker, so LOGIN_RATE_LIMIT_IP and LOGIN_RATE_LIMIT_IDENTIFIER are
+    divided between the workers (at least one attempt each). A client spread over every worker still
+    gets at most the configured limit, one that stays on a single connection gets its share of it.
+  - the user profile cache and the token version cache only see the writes of their own worker. Their
+    TTLs default to 5 seconds instead of 60, which bounds how long another worker keeps answering for
+    a deleted user or a revoked token. An explicit USER_CACHE_TTL or TOKEN_VERSION_CACHE_TTL wins.
+  - SUPABASE_BACKEND=memory gives every worker its own database, use one worker with it.
+The verified token cache needs nothing: it only skips signature checks, revocation is checked after it.
+
+All settings come from the environment:
+
+    SERVER_HOST, SERVER_PORT          bind address, default 0.0.0.0:8000
+    SERVER_WORKERS                    worker processes, default the number of usable cores
+    SERVER_BACKLOG                    listen backlog shared by the workers, default 2048
+    SERVER_KEEPALIVE                  idle keep-alive seconds, default 65 (above common LB idle timeouts)
+    SERVER_LIMIT_CONCURRENCY          connections per worker before answering 503, default 1000
+    SERVER_MAX_REQUESTS               recycle a worker after this many requests, default off
+    SERVER_GRACEFUL_TIMEOUT           seconds to drain on shutdown, default 30
+    SERVER_ACCESS_LOG                 per-request access log, default off
+    SERVER_FORWARDED_ALLOW_IPS        proxies trusted for X-Forwarded-* headers, default 127.0.0.1
+"""
+import importlib.util
+import os
+import sys
+import uvicorn
+from backend.auth.rate_limit import DEFAULT_IDENTIFIER_LIMIT, DEFAULT_IP_LIMIT
+
+# Per-process cache TTL in seconds when several workers run, see the module docstring
+MULTI_WORKER_CACHE_TTL = '5'
+
+
+def available_cores() -> int:
+    # Honours CPU affinity (taskset, container cpusets) where the platform exposes it
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _optional_int(name: str) -> int | None:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def server_config() -> dict:
+    for module in ('uvloop', 'httptools'):
+        if importlib.util.find_spec(module) is None:
+            raise RuntimeError(f'{module} is required by the production server, install requirements.txt')
+    return {
+        'host': os.environ.get('SERVER_HOST', '0.0.0.0'),
+        'port': int(os.environ.get('SERVER_PORT', '8000')),
+        'workers': int(os.environ.get('SERVER_WORKERS', available_cores())),
+        'loop': 'uvloop',
+        'http': 'httptools',
+        'lifespan': 'on',
+        'backlog': int(os.environ.get('SERVER_BACKLOG', '2048')),
+        'timeout_keep_alive': int(os.environ.get('SERVER_KEEPALIVE', '65')),
+        'limit_concurrency': int(os.environ.get('SERVER_LIMIT_CONCURRENCY', '1000')),
+        'limit_max_requests': _optional_int('SERVER_MAX_REQUESTS'),
+        'timeout_graceful_shutdown': int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', '30')),
+        'access_log': os.environ.get('SERVER_ACCESS_LOG', 'false').lower() in {'1', 'true', 'yes'},
+        'proxy_headers': True,
+        'forwarded_allow_ips': os.environ.get('SERVER_FORWARDED_ALLOW_IPS', '127.0.0.1'),
+    }
+
+
+def share_cores(workers: int) -> None:
+    # Each worker owns a password hasher pool, split the cores between them instead of every worker
+    # starting one hashing process per core
+    os.environ.setdefault('HASH_MAX_WORKERS', str(max(1, available_cores() // workers)))
+
+
+def share_worker_state(workers: int) -> None:
+    # The workers inherit this environment, so every one of them builds its limiter and caches from it
+    if workers <= 1:
+        return
+    for name, default in (('LOGIN_RATE_LIMIT_IP', DEFAULT_IP_LIMIT), ('LOGIN_RATE_LIMIT_IDENTIFIER', DEFAULT_IDENTIFIER_LIMIT)):
+        attempts, _, period = os.environ.get(name, default).partition('/')
+        os.environ[name] = f'{max(1, int(attempts) // workers)}/{period}'
+    for name in ('USER_CACHE_TTL', 'TOKEN_VERSION_CACHE_TTL'):
+        os.environ.setdefault(name, MULTI_WORKER_CACHE_TTL)
+
+
+def main() -> int:
+    config = server_config()
+    share_cores(config['workers'])
+    share_worker_state(config['workers'])
+    uvicorn.run('backend.app:app', **config)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+from functools import lru_cache
+from typing import Literal
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    # Deployment settings, read from the environment once per process by get_settings(). .env is loaded into
+    # the environment when the backend package is imported, so it applies here and to the tuning knobs (pool
+    # sizes, caches, rate limits, hashing) that stay with the component that owns them.
+    model_config = SettingsConfigDict(extra='ignore')
+
+    env: Literal['dev', 'test', 'prod'] | None = None
+    supabase_backend: Literal['supabase', 'memory'] = 'supabase'
+    supabase_db_url: str | None = None
+    supabase_secret_key: str | None = None
+
+    auth_hash_key: str | None = None
+    secret_algorithm: str | None = None
+    # 'subject' tokens only carry the user id and are checked against the user's cached row. 'claims' tokens also
+    # embed the public profile, /current_user answers them from the claims once their version matches the user's
+    # cached token_version (TOKEN_VERSION_CACHE_TTL), and services can verify them with the JWKS.
+    auth_token_mode: Literal['subject', 'claims'] = 'subject'
+    # 'jose' (default), 'pyjwt' (also signs EdDSA) or 'hmac' (HS* only, no JOSE library on the hot path)
+    auth_token_codec: str = 'jose'
+    auth_keys_dir: str | None = None
+    auth_keys_reload_interval: float = 30.0
+
+    # /metrics and the Server-Timing header describe the app's internals. Outside dev and test /metrics is only
+    # served when METRICS_TOKEN is set and scrapers send it as a bearer token, and Server-Timing is off unless
+    # METRICS_SERVER_TIMING turns it on
+    metrics_token: str | None = None
+    metrics_server_timing: bool | None = None
+
+    # 'blocking' finishes the password hasher warmup before the app accepts requests, 'background' lets a
+    # freshly scaled-out instance serve immediately while the hashing workers start
+    startup_warmup: Literal['blocking', 'background'] = 'blocking'
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
@@ -0,0 +1,203 @@
+"""Latency and throughput benchmark for the auth API.
+
+Drives backend.app.app in-process over ASGI against the in-memory supabase stand-in, so runs are
+reproducible and never touch a real database. Every worker is a separate process with its own app
+and data, mirroring `uvicorn --workers N`.
+
+    python -m benchmarks.bench_auth_api --concurrency 1,8,32 --workers 1,2 --requests 200 --output bench.json
+    python -m benchmarks.bench_auth_api --baseline bench.json --max-regression 0.2
+
+With --baseline the run exits non-zero when any p95 is more than --max-regression slower.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+os.environ.setdefault('ENV', 'test')
+os.environ['SUPABASE_BACKEND'] = 'memory'
+os.environ.setdefault('AUTH_HASH_KEY', 'benchmark-secret-key')
+os.environ.setdefault('SECRET_ALGORITHM', 'HS256')
+# Every benchmark request comes from one client address, which the login limiter would shed
+os.environ.setdefault('LOGIN_RATE_LIMIT_ENABLED', 'false')
+
+ENDPOINTS = ('token', 'refresh', 'register', 'current_user', 'delete_current_user')
+PASSWORD = 'BenchMark123!'
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def seed_users(db, count: int, prefix: str) -> list[dict]:
+    from backend.auth.hashing import password_hasher
+    from backend.database.utils.db_utils import get_table_by_env
+    password_hash = await password_hasher.hash(PASSWORD)
+    rows = [{'username': f'{prefix}{index}', 'email': f'{prefix}{index}@bench.example.com', 'password': password_hash} for index in range(count)]
+    response = await db.table(get_table_by_env('users')).insert(rows).execute()
+    return response.data
+
+
+def build_requests(endpoint: str, users: list[dict], worker: int, count: int, refresh_tokens: list[str] | None = None) -> list[tuple[str, str, dict]]:
+    from backend.auth.tokens import access_token_claims, create_access_token
+
+    def bearer(user: dict) -> dict:
+        token = create_access_token(data=access_token_claims(user), expires_delta=timedelta(minutes=30))
+        return {'headers': {'Authorization': f'Bearer {token}'}}
+
+    if endpoint == 'token':
+        return [('POST', '/api/auth/token', {'json': {'username': users[index % len(users)]['username'], 'password': PASSWORD}}) for index in range(count)]
+    if endpoint == 'refresh':
+        # Refresh tokens rotate, so every request presents a token of its own
+        return [('POST', '/api/auth/refresh', {'json': {'refresh_token': refresh_token}}) for refresh_token in refresh_tokens]
+    if endpoint == 'register':
+        return [('POST', '/api/auth/register', {'json': {'username': f'new{worker}x{index}', 'email': f'new{worker}x{index}@bench.example.com', 'password': PASSWORD}}) for index in range(count)]
+    if endpoint == 'current_user':
+        return [('GET', '/api/auth/current_user', bearer(users[index % len(users)])) for index in range(count)]
+    return [('DELETE', '/api/auth/current_user', bearer(users[index])) for index in range(count)]
+
+
+async def drive(app, requests: list[tuple[str, str, dict]], concurrency: int) -> tuple[list[float], int, float]:
+    import httpx
+    latencies: list[float] = []
+    errors = 0
+    pending = iter(requests)
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for method, path, kwargs in pending:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+async def run_worker_async(worker: int, endpoint: str, concurrency: int, count: int) -> dict:
+    from backend.app import app
+    from backend.auth.hashing import password_hasher
+    from backend.auth.refresh_tokens import issue_refresh_token
+    from backend.database.utils.memory_client import isolated_memory_client
+
+    with isolated_memory_client() as db:
+        try:
+            await password_hasher.warmup()
+            users = await seed_users(db, max(count, 1) if endpoint == 'delete_current_user' else min(count, 50) or 1, f'bench{worker}u')
+            refresh_tokens = [await issue_refresh_token(db, user_id=users[index % len(users)]['id']) for index in range(count)] if endpoint == 'refresh' else None
+            requests = build_requests(endpoint, users, worker, count, refresh_tokens)
+            # One untimed pass over a few requests warms caches the same way a running server would be warm
+            if endpoint in ('token', 'current_user'):
+                await drive(app, requests[:concurrency], concurrency)
+            latencies, errors, elapsed = await drive(app, requests, concurrency)
+        finally:
+            password_hasher.shutdown()
+    return {'latencies': latencies, 'errors': errors, 'elapsed': elapsed}
+
+
+def run_worker(worker: int, endpoint: str, concurrency: int, count: int, results) -> None:
+    results.put(asyncio.run(run_worker_async(worker, endpoint, concurrency, count)))
+
+
+def run_scenario(endpoint: str, workers: int, concurrency: int, count: int) -> dict:
+    # Each worker process gets count requests and drives them with `concurrency` in-flight clients
+    if workers == 1:
+        outcomes = [asyncio.run(run_worker_async(0, endpoint, concurrency, count))]
+    else:
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [context.Process(target=run_worker, args=(worker, endpoint, concurrency, count, results)) for worker in range(workers)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    latencies = [latency for outcome in outcomes for latency in outcome['latencies']]
+    wall = max(outcome['elapsed'] for outcome in outcomes)
+    return {
+        'endpoint': endpoint,
+        'workers': workers,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(outcome['errors'] for outcome in outcomes),
+        'throughput_rps': len(latencies) / wall if wall else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def find_regressions(results: list[dict], baseline: dict, max_regression: float) -> list[str]:
+    previous = {(row['endpoint'], row['workers'], row['concurrency']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        before = previous.get((row['endpoint'], row['workers'], row['concurrency']))
+        if before and before['p95_ms'] > 0 and row['p95_ms'] > before['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{row['endpoint']} workers={row['workers']} concurrency={row['concurrency']}: p95 {before['p95_ms']:.1f}ms -> {row['p95_ms']:.1f}ms")
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='comma separated subset of ' + ', '.join(ENDPOINTS))
+    parser.add_argument('--concurrency', default='1,8,32', help='comma separated in-flight request counts per worker')
+    parser.add_argument('--workers', default='1', help='comma separated worker process counts')
+    parser.add_argument('--requests', type=int, default=200, help='requests per worker per scenario')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='allowed p95 slowdown versus the baseline, 0.2 = 20%%')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    endpoints = [endpoint for endpoint in args.endpoints.split(',') if endpoint]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+    results = []
+    for workers in (int(value) for value in args.workers.split(',')):
+        for concurrency in (int(value) for value in args.concurrency.split(',')):
+            for endpoint in endpoints:
+                row = run_scenario(endpoint, workers, concurrency, args.requests)
+                results.append(row)
+                print(f"{endpoint:<20} workers={workers:<2} concurrency={concurrency:<3} {row['throughput_rps']:9.1f} req/s  p50={row['p50_ms']:.1f}ms p95={row['p95_ms']:.1f}ms p99={row['p99_ms']:.1f}ms errors={row['errors']}", file=sys.stderr)
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(), 'requests_per_worker': args.requests, 'hash_executor': os.environ.get('HASH_EXECUTOR', 'process'), 'token_mode': os.environ.get('AUTH_TOKEN_MODE', 'subject')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.max_regression)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
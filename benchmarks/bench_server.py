@@ -0,0 +1,158 @@
+"""Compares the production server profile with the previous `make prod` command over real HTTP.
+
+Starts each server as a subprocess on a local port against the in-memory database and drives it with
+keep-alive connections:
+
+    baseline  uvicorn backend.app:app                (the old prod target: one process, default options)
+    server    python -m backend.server               (SERVER_WORKERS, uvloop, httptools, no access log)
+
+    python -m benchmarks.bench_server --requests 2000 --concurrency 64 --output server.json
+
+Scenarios need no state shared between workers: `jwks` serves the public key set, a route with no
+database or hashing work, and `token` is a login for an unknown user, i.e. one bcrypt verify of the
+dummy hash.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('ENV', 'test')
+os.environ.setdefault('AUTH_HASH_KEY', 'benchmark-secret-key')
+os.environ.setdefault('SECRET_ALGORITHM', 'HS256')
+
+from benchmarks.bench_auth_api import percentile
+
+PROFILES = {
+    'baseline': [sys.executable, '-m', 'uvicorn', 'backend.app:app', '--host', '127.0.0.1', '--port', '{port}'],
+    'server': [sys.executable, '-m', 'backend.server'],
+}
+SCENARIOS = ('jwks', 'token')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_env(port: int, workers: int | None) -> dict:
+    env = {**os.environ, 'SUPABASE_BACKEND': 'memory', 'LOGIN_RATE_LIMIT_ENABLED': 'false', 'SERVER_HOST': '127.0.0.1', 'SERVER_PORT': str(port)}
+    if workers:
+        env['SERVER_WORKERS'] = str(workers)
+    return env
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float) -> float:
+    import httpx
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f'server exited with {process.returncode}')
+            try:
+                if (await client.get('/.well-known/jwks.json')).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise RuntimeError('server did not become ready')
+
+
+def scenario_request(scenario: str) -> tuple[str, str, dict, int]:
+    if scenario == 'jwks':
+        return 'GET', '/.well-known/jwks.json', {}, 200
+    return 'POST', '/api/auth/token', {'json': {'username': 'nobody_here', 'password': 'NotAUser123!'}}, 401
+
+
+async def load(base_url: str, scenario: str, concurrency: int, count: int) -> dict:
+    import httpx
+    method, path, kwargs, expected_status = scenario_request(scenario)
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(count))
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                if response.status_code != expected_status:
+                    errors += 1
+            except httpx.TransportError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def run_profile(profile: str, scenarios: list[str], concurrency: int, count: int, workers: int | None) -> list[dict]:
+    port = free_port()
+    command = [part.format(port=port) for part in PROFILES[profile]]
+    process = subprocess.Popen(command, env=server_env(port, workers), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        ready_seconds = await wait_until_ready(base_url, process, timeout=120)
+        rows = []
+        for scenario in scenarios:
+            # A short untimed pass opens the connections and warms every worker
+            await load(base_url, scenario, concurrency, concurrency)
+            row = await load(base_url, scenario, concurrency, count if scenario == 'jwks' else max(count // 50, concurrency))
+            rows.append({'profile': profile, 'ready_s': ready_seconds, **row})
+        return rows
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000, help='jwks requests, token runs 1/50th of this')
+    parser.add_argument('--workers', type=int, help='SERVER_WORKERS for the server profile, default one per core')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args(argv)
+    results = []
+    for profile in args.profiles.split(','):
+        for row in asyncio.run(run_profile(profile, args.scenarios.split(','), args.concurrency, args.requests, args.workers)):
+            results.append(row)
+            print(f"{row['profile']:<9} {row['scenario']:<13} ready={row['ready_s']:.1f}s {row['throughput_rps']:8.1f} req/s p50={row['p50_ms']:.1f}ms p99={row['p99_ms']:.1f}ms errors={row['errors']}", file=sys.stderr)
+    report = {'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Cold start profile of backend.app: import, lifespan startup and first request, each in a fresh interpreter.
+
+    import      `import backend.app`, i.e. every module the app pulls in at import time
+    startup     the lifespan up to `yield`: database pool (supabase backend only), password hasher warmup,
+                JWT codec and key warmup
+    first       the first request after startup, /.well-known/jwks.json
+
+Defaults to the in-memory database so no network is involved; with SUPABASE_BACKEND=supabase the pool
+is opened against the configured project and startup includes importing supabase. --importtime adds the
+slowest modules from `python -X importtime` for the import phase. --budget-ms and --import-budget-ms
+turn the run into a check that exits 1 when the median cold start goes over budget, e.g. in a
+dedicated CI step on a quiet runner.
+
+    python -m benchmarks.bench_startup --runs 5 --importtime 15
+    python -m benchmarks.bench_startup --runs 5 --import-budget-ms 1500 --budget-ms 2500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = '''
+import asyncio, json, sys, time
+started = time.perf_counter()
+import backend.app
+imported = time.perf_counter()
+# Only needed once the app talks to a database, hashes a password or signs a token
+deferred = sorted(name for name in ('supabase', 'postgrest', 'httpx', 'passlib', 'jose.jwt', 'cryptography') if name in sys.modules)
+
+async def boot():
+    import httpx
+    app = backend.app.app
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://startup') as client:
+            (await client.get('/.well-known/jwks.json')).raise_for_status()
+        return ready, time.perf_counter()
+
+ready, answered = asyncio.run(boot())
+json.dump({
+    'import_ms': (imported - started) * 1000,
+    'startup_ms': (ready - imported) * 1000,
+    'first_request_ms': (answered - ready) * 1000,
+    'modules': len(sys.modules),
+    'deferred_imported': deferred,
+}, sys.stdout)
+'''
+
+
+def probe_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault('ENV', 'test')
+    env.setdefault('SUPABASE_BACKEND', 'memory')
+    env.setdefault('AUTH_HASH_KEY', 'startup-secret-key')
+    env.setdefault('SECRET_ALGORITHM', 'HS256')
+    return env
+
+
+def cold_start(env: dict | None = None) -> dict:
+    completed = subprocess.run([sys.executable, '-c', PROBE], env=env or probe_env(), capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def slowest_imports(limit: int, env: dict | None = None) -> list[dict]:
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import backend.app'], env=env or probe_env(), capture_output=True, text=True, check=True)
+    children, app_modules = [], []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix('import time:').split('|')
+        # Nesting is two spaces per level after the separator's own space, a package is printed after its imports
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        module = {'module': name.strip(), 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000}
+        if depth == 1:
+            children.append(module)
+        elif depth == 0:
+            if module['module'] == 'backend.app':
+                app_modules = [module, *children]
+            children = []
+    # backend.app and what it imports directly, each one's cumulative time includes everything below it
+    return sorted(app_modules, key=lambda module: module['cumulative_ms'], reverse=True)[:limit]
+
+
+def run(runs: int) -> dict:
+    samples = [cold_start() for _ in range(runs)]
+    summary = {phase: statistics.median(sample[phase] for sample in samples) for phase in ('import_ms', 'startup_ms', 'first_request_ms')}
+    summary['total_ms'] = summary['import_ms'] + summary['startup_ms'] + summary['first_request_ms']
+    return {'runs': runs, 'median': summary, 'samples': samples}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start, the median is reported')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N', help='also list the N slowest imports')
+    parser.add_argument('--budget-ms', type=float, help='fail when the median total cold start exceeds this')
+    parser.add_argument('--import-budget-ms', type=float, help='fail when the median import time exceeds this')
+    args = parser.parse_args(argv)
+    report = run(args.runs)
+    if args.importtime:
+        report['slowest_imports'] = slowest_imports(args.importtime)
+    median = report['median']
+    print(f"import={median['import_ms']:.0f}ms startup={median['startup_ms']:.0f}ms first_request={median['first_request_ms']:.0f}ms total={median['total_ms']:.0f}ms", file=sys.stderr)
+    for module in report.get('slowest_imports', []):
+        print(f"  {module['cumulative_ms']:8.1f}ms  {module['module']}", file=sys.stderr)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    over_budget = [
+        f'{phase} {median[key]:.0f}ms > {budget:.0f}ms'
+        for phase, key, budget in (('import', 'import_ms', args.import_budget_ms), ('total', 'total_ms', args.budget_ms))
+        if budget is not None and median[key] > budget
+    ]
+    if over_budget:
+        print(f"over budget: {', '.join(over_budget)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
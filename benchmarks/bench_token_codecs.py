@@ -0,0 +1,73 @@
+"""Encode/decode throughput of each token codec in backend.auth.token_codecs.
+
+Uses the same claims as a login in 'subject' mode and a fresh key per algorithm, pick a codec with
+AUTH_TOKEN_CODEC once the numbers are in.
+
+    python -m benchmarks.bench_token_codecs --number 5000
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+ALGORITHMS = ('HS256', 'ES256', 'EdDSA')
+SECRET = 'benchmark-secret-key-0123456789ab'
+
+
+def signing_keys() -> dict:
+    es256 = ec.generate_private_key(ec.SECP256R1())
+    eddsa = ed25519.Ed25519PrivateKey.generate()
+    return {'HS256': (SECRET, SECRET), 'ES256': (es256, es256.public_key()), 'EdDSA': (eddsa, eddsa.public_key())}
+
+
+def available_codecs() -> list:
+    from backend.auth.token_codecs import CODECS
+    codecs = []
+    for codec_class in CODECS.values():
+        try:
+            codecs.append(codec_class())
+        except RuntimeError:
+            continue
+    return codecs
+
+
+def ops_per_second(func, number: int) -> float:
+    return number / min(timeit.repeat(func, number=number, repeat=3))
+
+
+def run(number: int, algorithms: tuple[str, ...] = ALGORITHMS) -> list[dict]:
+    keys = signing_keys()
+    claims = {'sub': '12345', 'exp': datetime.now(timezone.utc) + timedelta(minutes=30)}
+    results = []
+    for codec in available_codecs():
+        for algorithm in algorithms:
+            if algorithm not in codec.algorithms:
+                continue
+            private_key, public_key = keys[algorithm]
+            token = codec.encode(claims, private_key, algorithm)
+            results.append({
+                'codec': codec.name,
+                'algorithm': algorithm,
+                'encode_ops': ops_per_second(lambda: codec.encode(claims, private_key, algorithm), number),
+                'decode_ops': ops_per_second(lambda: codec.decode(token, public_key, algorithm), number),
+            })
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=5000, help='operations per repeat')
+    parser.add_argument('--algorithms', default=','.join(ALGORITHMS), help='comma separated subset of ' + ', '.join(ALGORITHMS))
+    args = parser.parse_args(argv)
+    results = run(args.number, tuple(algorithm for algorithm in args.algorithms.split(',') if algorithm))
+    for row in results:
+        print(f"{row['codec']:<6} {row['algorithm']:<6} encode={row['encode_ops']:10.0f} ops/s decode={row['decode_ops']:10.0f} ops/s", file=sys.stderr)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
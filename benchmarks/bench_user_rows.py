@@ -0,0 +1,147 @@
+"""CPU and allocation cost of building and returning a user profile, before and after UserRow.
+
+    before  select id,username,email,password, pop the hash, UserResponse.model_validate (EmailStr included),
+            cache hits rebuilt with model_construct, /current_user serialized through its response model
+    after   select id,username,email, UserRow.from_row, /current_user rendered straight from the row
+
+Each step is timed with time.process_time and traced with tracemalloc, one operation at a time for the
+peak allocation and 1000 live objects for the retained size. The `current_user` step drives a FastAPI
+app in-process, so it includes routing and response rendering. Pydantic does not re-validate a model
+instance of the response model's own class, so expect that step to come out even: the saving is in
+building the profile on a cache miss and a cache hit.
+
+    python -m benchmarks.bench_user_rows --number 20000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+
+ROW = {'id': 12345, 'username': 'returning_user', 'email': 'returning.user@example.com'}
+CREDENTIAL_ROW = {**ROW, 'password': '$2b$12$' + 'x' * 53}
+
+
+def cpu_per_op(func, number: int) -> float:
+    best = float('inf')
+    for _ in range(3):
+        started = time.process_time()
+        for _ in range(number):
+            func()
+        best = min(best, time.process_time() - started)
+    return best / number
+
+
+def peak_bytes(func) -> int:
+    func()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def retained_bytes(func, count: int = 1000) -> float:
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        kept = [func() for _ in range(count)]
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del kept
+    return retained / count
+
+
+def profile_steps() -> dict:
+    from backend.database.models.user import UserResponse, UserRow
+
+    def before_miss():
+        row = dict(CREDENTIAL_ROW)
+        row.pop('password', None)
+        user = UserResponse.model_validate(row)
+        return user, user.model_dump()
+
+    def after_miss():
+        user = UserRow.from_row(dict(ROW))
+        return user, user.model_dump()
+
+    cached = UserResponse.model_validate(ROW).model_dump()
+    return {
+        'cache_miss': (before_miss, after_miss),
+        'cache_hit': (lambda: UserResponse.model_construct(**cached), lambda: UserRow.from_row(cached)),
+    }
+
+
+def current_user_step():
+    import httpx
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+    from backend.database.models.user import UserResponse, UserRow
+
+    app = FastAPI()
+    before_user = UserResponse.model_construct(**ROW)
+    after_user = UserRow.from_row(ROW)
+
+    @app.get('/before')
+    async def before() -> UserResponse:
+        return before_user
+
+    @app.get('/after', response_model=UserResponse)
+    async def after() -> JSONResponse:
+        return JSONResponse(after_user.model_dump())
+
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench')
+
+    def request(path: str):
+        response = loop.run_until_complete(client.get(path))
+        assert response.json() == {**ROW, 'is_active': True}
+
+    def close():
+        loop.run_until_complete(client.aclose())
+        loop.close()
+
+    return (lambda: request('/before'), lambda: request('/after')), close
+
+
+def measure(name: str, before, after, number: int, retained: bool) -> dict:
+    row = {'step': name}
+    for label, func in (('before', before), ('after', after)):
+        row[f'{label}_us'] = cpu_per_op(func, number) * 1e6
+        row[f'{label}_peak_bytes'] = peak_bytes(func)
+        if retained:
+            row[f'{label}_retained_bytes'] = retained_bytes(func)
+    row['speedup'] = row['before_us'] / row['after_us'] if row['after_us'] else 0.0
+    return row
+
+
+def run(number: int, requests: int) -> list[dict]:
+    results = [measure(name, before, after, number, retained=True) for name, (before, after) in profile_steps().items()]
+    (before, after), close = current_user_step()
+    try:
+        results.append(measure('current_user', before, after, requests, retained=False))
+    finally:
+        close()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='operations per repeat for the profile steps')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per repeat for the current_user step')
+    args = parser.parse_args(argv)
+    results = run(args.number, args.requests)
+    for row in results:
+        print(f"{row['step']:<13} before={row['before_us']:8.2f}us peak={row['before_peak_bytes']:6d}B  after={row['after_us']:8.2f}us peak={row['after_peak_bytes']:6d}B  x{row['speedup']:.2f}", file=sys.stderr)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -40,7 +40,8 @@ export default function HomeScreen() {
     fetchUserInfo();
   }, []);
 
-  const fetchUserInfo = async () => {
+  // One refresh per failed request: a token that is still rejected after a refresh sends the user to Login
+  const fetchUserInfo = async (afterRefresh = false) => {
     try {
       const token = await AsyncStorage.getItem('auth_token');
       
@@ -53,12 +54,31 @@ export default function HomeScreen() {
       setUserInfo(user);
     } catch (error: any) {
       if (error.response?.status === 401) {
-        await AsyncStorage.removeItem('auth_token');
+        if (!afterRefresh && await refreshSession()) {
+          await fetchUserInfo(true);
+          return;
+        }
+        await AsyncStorage.multiRemove(['auth_token', 'refresh_token']);
         navigation.navigate('Login');
       }
     }
   };
 
+  const refreshSession = async (): Promise<boolean> => {
+    const refreshToken = await AsyncStorage.getItem('refresh_token');
+    if (!refreshToken) {
+      return false;
+    }
+    try {
+      const response = await authAPI.refresh(refreshToken);
+      await AsyncStorage.setItem('auth_token', response.access_token);
+      await AsyncStorage.setItem('refresh_token', response.refresh_token);
+      return true;
+    } catch {
+      return false;
+    }
+  };
+
   const pickImage = async () => {
     const permissionResult = await ImagePicker.requestMediaLibraryPermissionsAsync();
     
@@ -152,7 +172,7 @@ export default function HomeScreen() {
           text: 'Logout',
           style: 'destructive',
           onPress: async () => {
-            await AsyncStorage.removeItem('auth_token');
+            await AsyncStorage.multiRemove(['auth_token', 'refresh_token']);
             navigation.navigate('Login');
           },
         },
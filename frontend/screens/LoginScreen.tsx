@@ -44,6 +44,7 @@ export default function LoginScreen() {
       const response = await authAPI.login(credentials);
 
       await AsyncStorage.setItem('auth_token', response.access_token);
+      await AsyncStorage.setItem('refresh_token', response.refresh_token);
 
       setUsername('');
       setPassword('');
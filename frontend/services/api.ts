@@ -18,6 +18,7 @@ export interface LoginRequest {
 export interface LoginResponse {
   access_token: string;
   token_type: string;
+  refresh_token: string;
 }
 
 export interface RegisterRequest {
@@ -32,6 +33,13 @@ export const authAPI = {
     return response.data;
   },
 
+  // Trades a refresh token for a new access/refresh pair without re-entering the password.
+  // The old refresh token stops working, so always store the new one.
+  refresh: async (refreshToken: string): Promise<LoginResponse> => {
+    const response = await api.post<LoginResponse>('/api/auth/refresh', { refresh_token: refreshToken });
+    return response.data;
+  },
+
   register: async (data: RegisterRequest) => {
     const response = await api.post('/api/auth/register', data);
     return response.data;
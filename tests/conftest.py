@@ -0,0 +1,18 @@
+import pytest
+from backend.auth.tokens import token_cache, token_versions
+from backend.database.utils.user_cache import InMemoryCacheBackend, user_cache
+from backend.settings import get_settings
+
+
+def pytest_runtest_setup(item):
+    # memory_backend tests look inside the in-memory client (recorded queries, rows edited in place)
+    if item.get_closest_marker('memory_backend') and get_settings().supabase_backend != 'memory':
+        pytest.skip('inspects the in-memory database, needs SUPABASE_BACKEND=memory')
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    # Token revocation is stored with the user, only the per-process caches in front of it can leak between tests
+    token_cache.clear()
+    token_versions.clear()
+    monkeypatch.setattr(user_cache, 'backend', InMemoryCacheBackend())
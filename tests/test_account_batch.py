@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+from backend.app import app
+from backend.database.utils import db_utils
+from backend.database.utils.memory_client import get_memory_client
+from tests.test_registration import cleanup_account
+
+client = TestClient(app)
+
+def register(username: str, email: str):
+    response = client.post('api/auth/register', json={'username': username, 'email': email, 'password': 'BatchPass123!'})
+    assert response.status_code == 200
+
+def test_batch_lookup_reports_each_identifier():
+    cleanup_account('batchuser1', 'batchuser2')
+    register('batchuser1', 'batch1@example.com')
+    register('batchuser2', 'batch2@example.com')
+
+    response = client.post('api/db/accounts/batch/lookup', json={'identifiers': ['batchuser1', 'batch2@example.com', 'nobody_here', 'batchuser1']})
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'identifier': 'batchuser1', 'found': True},
+        {'identifier': 'batch2@example.com', 'found': True},
+        {'identifier': 'nobody_here', 'found': False},
+    ]
+    cleanup_account('batchuser1', 'batchuser2')
+
+@pytest.mark.memory_backend
+def test_batch_delete_is_one_query_per_chunk(monkeypatch):
+    usernames = [f'chunkuser{index}' for index in range(5)]
+    cleanup_account(*usernames)
+    for username in usernames:
+        register(username, f'{username}@example.com')
+    monkeypatch.setattr(db_utils, 'BATCH_CHUNK_SIZE', 2)
+    executed = get_memory_client().executed
+    before = len(executed)
+
+    response = client.post('api/db/accounts/batch/delete', json={'identifiers': usernames + ['missing_user']})
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [result['deletion_successful'] for result in results] == [True] * 5 + [False]
+    # 6 identifiers in chunks of 2
+    users_table = db_utils.get_table_by_env('users')
+    assert [method for table, method in executed[before:] if table == users_table] == ['delete'] * 3
+
+    lookup = client.post('api/db/accounts/batch/lookup', json={'identifiers': usernames}).json()
+    assert not any(result['found'] for result in lookup['results'])
+
+def test_batch_identifiers_are_quoted():
+    cleanup_account('quoteuser')
+    register('quoteuser', 'quote@example.com')
+    response = client.post('api/db/accounts/batch/delete', json={'identifiers': ['x),username.eq.quoteuser,email.in.(y', 'a"b']})
+    assert response.status_code == 200
+    assert not any(result['deletion_successful'] for result in response.json()['results'])
+    assert client.post('api/db/accounts/batch/lookup', json={'identifiers': ['quoteuser']}).json()['results'][0]['found']
+    cleanup_account('quoteuser')
+
+def test_batch_request_limits():
+    assert client.post('api/db/accounts/batch/lookup', json={'identifiers': []}).status_code == 422
+    assert client.post('api/db/accounts/batch/lookup', json={'identifiers': ['x'] * 1001}).status_code == 422
@@ -0,0 +1,40 @@
+from backend.auth.models.login_request import LoginRequest
+from backend.auth.models.register_request import RegisterRequest
+from benchmarks.bench_auth_api import find_regressions, percentile, run_scenario
+from benchmarks.bench_token_codecs import run as run_codecs
+from benchmarks.bench_user_rows import run as run_user_rows
+from benchmarks.bench_validation import INVALID_PAYLOADS, LOGIN_PAYLOADS, REGISTER_PAYLOADS, LegacyLoginRequest, LegacyRegisterRequest, error_messages
+
+def test_percentile_picks_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 0.5) == 51.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+def test_find_regressions_flags_slower_p95():
+    baseline = {'results': [{'endpoint': 'token', 'workers': 1, 'concurrency': 8, 'p95_ms': 100.0}]}
+    assert find_regressions([{'endpoint': 'token', 'workers': 1, 'concurrency': 8, 'p95_ms': 115.0}], baseline, 0.2) == []
+    assert len(find_regressions([{'endpoint': 'token', 'workers': 1, 'concurrency': 8, 'p95_ms': 130.0}], baseline, 0.2)) == 1
+
+def test_current_user_scenario_runs_against_memory_backend():
+    row = run_scenario('current_user', workers=1, concurrency=2, count=4)
+    assert row['requests'] == 4
+    assert row['errors'] == 0
+    assert row['p99_ms'] >= row['p50_ms'] > 0
+
+def test_validators_report_the_same_errors_as_the_previous_models():
+    for payload in REGISTER_PAYLOADS + INVALID_PAYLOADS:
+        assert error_messages(RegisterRequest, payload) == error_messages(LegacyRegisterRequest, payload)
+    for payload in LOGIN_PAYLOADS + INVALID_PAYLOADS + [{'password': 'SecurePass123!'}]:
+        assert error_messages(LoginRequest, payload) == error_messages(LegacyLoginRequest, payload)
+
+def test_token_codec_benchmark_covers_every_codec():
+    rows = run_codecs(number=5, algorithms=('HS256', 'EdDSA'))
+    assert {(row['codec'], row['algorithm']) for row in rows} == {('jose', 'HS256'), ('pyjwt', 'HS256'), ('hmac', 'HS256'), ('pyjwt', 'EdDSA')}
+    assert all(row['encode_ops'] > 0 and row['decode_ops'] > 0 for row in rows)
+
+def test_user_row_benchmark_compares_each_step():
+    rows = run_user_rows(number=5, requests=2)
+    assert [row['step'] for row in rows] == ['cache_miss', 'cache_hit', 'current_user']
+    assert all(row['before_us'] > 0 and row['after_us'] > 0 for row in rows)
+    assert rows[0]['after_retained_bytes'] < rows[0]['before_retained_bytes']
@@ -0,0 +1,96 @@
+import asyncio
+import io
+import json
+import pytest
+from backend.auth.hashing import HashPolicy, PasswordHasher
+from backend.database.bulk import export_users, import_users, main, read_rows, write_rows
+from backend.database.utils.db_utils import UserConflictError, get_table_by_env
+from backend.database.utils.memory_client import MemoryClient, get_memory_client
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=2, max_queue=1, policy=HashPolicy(bcrypt_rounds=4))
+    yield hasher
+    hasher.shutdown()
+
+def users_in(db):
+    return db.get_table(get_table_by_env('users')).rows
+
+def test_import_hashes_plaintext_and_keeps_recognised_hashes(hasher):
+    db = MemoryClient()
+    existing_hash = asyncio.run(hasher.hash('Imported123!'))
+    rows = [
+        {'username': 'bulk_one', 'email': 'one@example.com', 'password': 'Imported123!'},
+        {'username': 'bulk_two', 'email': 'two@example.com', 'password_hash': existing_hash},
+        {'username': 'bulk_three', 'email': 'three@example.com', 'password_hash': '5f4dcc3b5aa765d61d8327deb882cf99'},
+        {'username': '_bad', 'email': 'bad@example.com', 'password': 'Imported123!'},
+        {'username': 'bulk_four', 'email': 'four@example.com'},
+    ]
+    errors = []
+    report = asyncio.run(import_users(db, rows, chunk_size=2, hasher=hasher, on_error=lambda row, reason: errors.append(row['username'])))
+    assert report == {'inserted': 2, 'skipped': 0, 'invalid': 3}
+    assert errors == ['bulk_three', '_bad', 'bulk_four']
+    stored = {user['username']: user['password'] for user in users_in(db)}
+    assert stored['bulk_two'] == existing_hash
+    assert asyncio.run(hasher.verify('Imported123!', stored['bulk_one']))
+
+def test_import_skips_existing_and_repeated_accounts(hasher):
+    db = MemoryClient()
+    rows = [{'username': f'bulk{index}', 'email': f'bulk{index}@example.com', 'password': 'Imported123!'} for index in range(6)]
+    asyncio.run(import_users(db, rows[:2], hasher=hasher))
+    rows.append({'username': 'bulk5', 'email': 'other@example.com', 'password': 'Imported123!'})
+    report = asyncio.run(import_users(db, rows, chunk_size=4, hasher=hasher))
+    assert report == {'inserted': 4, 'skipped': 3, 'invalid': 0}
+    assert len(users_in(db)) == 6
+
+def test_import_can_fail_on_conflict(hasher):
+    db = MemoryClient()
+    row = {'username': 'bulk_dupe', 'email': 'dupe@example.com', 'password': 'Imported123!'}
+    asyncio.run(import_users(db, [row], hasher=hasher))
+    with pytest.raises(UserConflictError):
+        asyncio.run(import_users(db, [row], on_conflict='fail', hasher=hasher))
+
+def test_malformed_ndjson_lines_are_reported_not_fatal(hasher):
+    db = MemoryClient()
+    source = io.StringIO('\n'.join([
+        json.dumps({'username': 'ndjson_one', 'email': 'ndjson.one@example.com', 'password': 'Imported123!'}),
+        '{"username": "broken", ',
+        '["not", "an", "object"]',
+        '',
+        json.dumps({'username': 'ndjson_two', 'email': 'ndjson.two@example.com', 'password': 'Imported123!'}),
+    ]))
+    errors = []
+    report = asyncio.run(import_users(db, read_rows(source, 'ndjson'), chunk_size=2, hasher=hasher, on_error=lambda row, reason: errors.append(reason)))
+    assert report == {'inserted': 2, 'skipped': 0, 'invalid': 2}
+    assert errors[0].startswith('line 2: invalid JSON')
+    assert errors[1] == 'line 3: expected a JSON object'
+    assert [user['username'] for user in users_in(db)] == ['ndjson_one', 'ndjson_two']
+
+def test_export_pages_by_id_and_round_trips(hasher):
+    db = MemoryClient()
+    rows = [{'username': f'export{index}', 'email': f'export{index}@example.com', 'password': 'Exported123!'} for index in range(7)]
+    asyncio.run(import_users(db, rows, hasher=hasher))
+    db.executed.clear()
+
+    output = io.StringIO()
+    written = asyncio.run(write_rows(export_users(db, page_size=3), output, 'csv'))
+    assert written == 7
+    # 3 + 3 + 1 rows, the short last page ends the scan
+    assert db.executed == [(get_table_by_env('users'), 'select')] * 3
+
+    copy = MemoryClient()
+    output.seek(0)
+    report = asyncio.run(import_users(copy, read_rows(output, 'csv'), hasher=hasher))
+    assert report['inserted'] == 7
+    assert [user['password'] for user in users_in(copy)] == [user['password'] for user in users_in(db)]
+
+@pytest.mark.memory_backend
+def test_cli_imports_ndjson(tmp_path):
+    path = tmp_path / 'users.ndjson'
+    path.write_text(json.dumps({'username': 'cli_bulk_user', 'email': 'cli.bulk@example.com', 'password': 'Imported123!'}) + '\n\n')
+    try:
+        assert main(['import', str(path)]) == 0
+        assert any(user['username'] == 'cli_bulk_user' for user in users_in(get_memory_client()))
+    finally:
+        table = get_memory_client().get_table(get_table_by_env('users'))
+        table.rows[:] = [user for user in table.rows if user['username'] != 'cli_bulk_user']
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from backend.database.utils.pool import ClientPool, PoolTimeoutError, PoolClosedError
+
+class StubClient:
+    def __init__(self):
+        self.healthy = True
+
+async def stub_ping(client):
+    if not client.healthy:
+        raise ConnectionError('connection reset')
+
+def make_pool(**kwargs):
+    created = []
+    async def factory():
+        client = StubClient()
+        created.append(client)
+        return client
+    pool = ClientPool(factory, ping=stub_ping, **kwargs)
+    pool.created = created
+    return pool
+
+def test_pool_creates_clients_up_front():
+    async def scenario():
+        pool = await make_pool(size=3).open()
+        assert len(pool.created) == 3
+        assert pool.stats()['leased'] == 0
+    asyncio.run(scenario())
+
+def test_pool_reuses_released_client():
+    async def scenario():
+        pool = await make_pool(size=1).open()
+        async with pool.connection() as first:
+            pass
+        async with pool.connection() as second:
+            pass
+        assert first is second
+        assert len(pool.created) == 1
+    asyncio.run(scenario())
+
+def test_pool_leases_client_to_concurrent_requests():
+    async def scenario():
+        pool = await make_pool(size=2, max_leases=2).open()
+        clients = [await pool.acquire() for _ in range(4)]
+        assert pool.stats()['leased'] == 4
+        assert len({id(client) for client in clients}) == 2
+    asyncio.run(scenario())
+
+def test_pool_checkout_times_out_when_exhausted():
+    async def scenario():
+        pool = await make_pool(size=1, max_leases=1, checkout_timeout=0.05).open()
+        client = await pool.acquire()
+        with pytest.raises(PoolTimeoutError):
+            await pool.acquire()
+        await pool.release(client)
+        assert await pool.acquire() is client
+    asyncio.run(scenario())
+
+def test_pool_replaces_unhealthy_idle_client():
+    async def scenario():
+        pool = await make_pool(size=1, health_check_interval=0).open()
+        client = await pool.acquire()
+        client.healthy = False
+        await pool.release(client)
+        replacement = await pool.acquire()
+        assert replacement is not client
+        assert len(pool.created) == 2
+    asyncio.run(scenario())
+
+def test_health_check_replaces_failed_clients():
+    async def scenario():
+        pool = await make_pool(size=2).open()
+        pool.created[0].healthy = False
+        assert await pool.health_check() == 1
+        assert len(pool.created) == 3
+    asyncio.run(scenario())
+
+def test_close_drains_checked_out_clients():
+    async def scenario():
+        pool = await make_pool(size=1).open()
+        client = await pool.acquire()
+
+        async def finish_request():
+            await asyncio.sleep(0.05)
+            await pool.release(client)
+
+        finishing = asyncio.create_task(finish_request())
+        await pool.close(drain_timeout=2)
+        await finishing
+        assert pool.stats()['leased'] == 0
+        with pytest.raises(PoolClosedError):
+            await pool.acquire()
+    asyncio.run(scenario())
+
+def test_health_check_ping_does_not_block_other_checkouts():
+    async def scenario():
+        ping_started, finish_ping = asyncio.Event(), asyncio.Event()
+        created = []
+
+        async def factory():
+            created.append(StubClient())
+            return created[-1]
+
+        async def slow_ping(client):
+            if client is created[0]:
+                ping_started.set()
+                await finish_ping.wait()
+
+        pool = await ClientPool(factory, ping=slow_ping, size=2, health_check_interval=0).open()
+        checking = asyncio.create_task(pool.acquire())
+        await ping_started.wait()
+        # The client being pinged is out of rotation, the other one is handed out without waiting for the ping
+        other = await asyncio.wait_for(pool.acquire(), 0.5)
+        assert pool.stats()['leased'] == 2
+        finish_ping.set()
+        assert await checking is not other
+    asyncio.run(scenario())
@@ -1,12 +1,20 @@
+import asyncio
 import pytest
 from backend.auth.models.register_request import RegisterRequest
 from backend.auth.models.login_request import LoginRequest
 from fastapi.testclient import TestClient
 from backend.app import app
+from backend.auth import tokens
+from backend.database.utils.db_utils import db_session, get_user
+from backend.database.utils.memory_client import get_memory_client
 from tests.test_registration import cleanup_account
 
 client = TestClient(app)
 
+async def stored_user_id(username):
+    async with db_session() as db:
+        return (await get_user(db, username))['id']
+
 # ============ SUCCESSFUL DELETION TESTS ============
 
 def test_delete_own_account():
@@ -359,3 +367,56 @@ def test_delete_wrong_http_method():
     assert post_response.status_code == 405  # Method Not Allowed
     
     cleanup_account(username)
+
+# ============ QUERY TESTS ============
+
+@pytest.mark.memory_backend
+def test_delete_is_one_primary_key_round_trip():
+    """Test that deleting the current user does no lookup before the delete"""
+    username = 'pkdelete'
+    password = 'PkDelete123!'
+    cleanup_account(username)
+    client.post('api/auth/register', json=RegisterRequest(username=username, email='pkdelete@test.com', password=password).model_dump())
+    token = client.post('api/auth/token', json=LoginRequest(username=username, password=password).model_dump()).json()['access_token']
+    executed = get_memory_client().executed
+    before = len(executed)
+
+    delete_response = client.delete('api/auth/current_user', headers={'Authorization': f'Bearer {token}'})
+    assert delete_response.status_code == 200
+    assert delete_response.json()['username'] == username
+    users_queries = [method for table, method in executed[before:] if table.startswith('users')]
+    assert users_queries == ['delete']
+
+def test_db_delete_by_user_id():
+    """Test the test/dev delete endpoint by primary key"""
+    username = 'iddelete'
+    cleanup_account(username)
+    client.post('api/auth/register', json=RegisterRequest(username=username, email='iddelete@test.com', password='IdDelete123!').model_dump())
+    user_id = asyncio.run(stored_user_id(username))
+
+    response = client.delete('api/db/accounts/delete', params={'user_id': user_id})
+    assert response.status_code == 200
+    assert response.json() == {'account_identifier': user_id, 'username': username, 'deletion_successful': True}
+    assert client.delete('api/db/accounts/delete', params={'user_id': user_id}).status_code == 404
+    assert client.delete('api/db/accounts/delete').status_code == 400
+    assert client.delete('api/db/accounts/delete', params={'user_id': user_id, 'identifier': username}).status_code == 400
+
+@pytest.mark.parametrize('delete', [
+    lambda username, user_id: client.delete('api/db/accounts/delete', params={'identifier': username}),
+    lambda username, user_id: client.delete('api/db/accounts/delete', params={'user_id': user_id}),
+    lambda username, user_id: client.post('api/db/accounts/batch/delete', json={'identifiers': [username]}),
+], ids=['identifier', 'user_id', 'batch'])
+def test_every_delete_path_revokes_tokens(monkeypatch, delete):
+    # Claims tokens carry the whole profile, they must still stop working once the account is gone
+    monkeypatch.setattr(tokens, 'TOKEN_MODE', 'claims')
+    username = 'revokedpathuser'
+    password = 'RevokedPath123!'
+    cleanup_account(username)
+    client.post('api/auth/register', json=RegisterRequest(username=username, email='revokedpath@test.com', password=password).model_dump())
+    issued = client.post('api/auth/token', json=LoginRequest(username=username, password=password).model_dump()).json()
+    headers = {'Authorization': f"Bearer {issued['access_token']}"}
+    user_id = client.get('api/auth/current_user', headers=headers).json()['id']
+
+    assert delete(username, user_id).status_code == 200
+    assert client.get('api/auth/current_user', headers=headers).status_code == 401
+    assert client.post('api/auth/refresh', json={'refresh_token': issued['refresh_token']}).status_code == 401
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from typing import Annotated
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from backend.auth import dependencies
+from backend.auth.dependencies import Principal, get_current_principal
+from backend.auth.tokens import create_access_token, token_versions
+from backend.database.models.user import UserRow
+from backend.database.utils.db_utils import get_db_connection
+
+def make_client(monkeypatch, users):
+    lookups = []
+
+    async def fake_profile(db, user_id):
+        lookups.append(user_id)
+        return users.get(user_id)
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(dependencies, 'get_user_profile', fake_profile)
+
+    async def audit(principal: Annotated[Principal, Depends(get_current_principal)]) -> int:
+        return principal.user_id
+
+    app = FastAPI()
+
+    @app.get('/protected')
+    async def protected(principal: Annotated[Principal, Depends(get_current_principal)], audited_id: Annotated[int, Depends(audit)]):
+        return {'username': principal.user.username, 'audited_id': audited_id, 'stages': sorted(principal.timings)}
+
+    app.dependency_overrides[get_db_connection] = no_db
+    return TestClient(app), lookups
+
+def test_principal_is_resolved_once_per_request(monkeypatch):
+    client, lookups = make_client(monkeypatch, {1: UserRow(id=1, username='alice', email='alice@test.com')})
+    token = create_access_token({'sub': '1'}, expires_delta=timedelta(minutes=5))
+    response = client.get('/protected', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.json() == {'username': 'alice', 'audited_id': 1, 'stages': ['token_decode', 'user_lookup']}
+    assert lookups == [1]
+
+def test_unknown_user_is_rejected(monkeypatch):
+    client, _ = make_client(monkeypatch, {})
+    token = create_access_token({'sub': '1'}, expires_delta=timedelta(minutes=5))
+    response = client.get('/protected', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+
+def test_invalid_token_skips_lookup(monkeypatch):
+    client, lookups = make_client(monkeypatch, {})
+    response = client.get('/protected', headers={'Authorization': 'Bearer invalidtoken123'})
+    assert response.status_code == 401
+    assert lookups == []
+
+def test_claims_token_skips_lookup_once_its_version_is_known(monkeypatch):
+    client, lookups = make_client(monkeypatch, {1: UserRow(id=1, username='carol', email='carol@test.com')})
+    token = create_access_token({'sub': '1', 'username': 'carol', 'email': 'carol@test.com', 'ver': 0}, expires_delta=timedelta(minutes=5))
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/protected', headers=headers).json()['username'] == 'carol'
+    assert client.get('/protected', headers=headers).json() == {'username': 'carol', 'audited_id': 1, 'stages': ['token_decode']}
+    assert lookups == [1]
+
+def test_claims_token_of_a_deleted_user_is_rejected(monkeypatch):
+    client, lookups = make_client(monkeypatch, {})
+    token = create_access_token({'sub': '1', 'username': 'erin', 'email': 'erin@test.com', 'ver': 0}, expires_delta=timedelta(minutes=5))
+    assert client.get('/protected', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+    assert lookups == [1]
+
+def test_token_minted_before_a_version_bump_is_rejected(monkeypatch):
+    client, _ = make_client(monkeypatch, {1: UserRow(id=1, username='dave', email='dave@test.com', token_version=1)})
+    stale = create_access_token({'sub': '1', 'username': 'dave', 'email': 'dave@test.com', 'ver': 0}, expires_delta=timedelta(minutes=5))
+    current = create_access_token({'sub': '1', 'ver': 1}, expires_delta=timedelta(minutes=5))
+    assert client.get('/protected', headers={'Authorization': f'Bearer {stale}'}).status_code == 401
+    assert client.get('/protected', headers={'Authorization': f'Bearer {current}'}).status_code == 200
+
+def test_claims_token_below_the_cached_version_is_rejected_without_lookup(monkeypatch):
+    client, lookups = make_client(monkeypatch, {})
+    token_versions.put(1, 2)
+    stale = create_access_token({'sub': '1', 'username': 'frank', 'email': 'frank@test.com', 'ver': 1}, expires_delta=timedelta(minutes=5))
+    assert client.get('/protected', headers={'Authorization': f'Bearer {stale}'}).status_code == 401
+    assert lookups == []
@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from backend.auth.hashing import PasswordHasher, HashPolicy, argon2_available
+
+LEGACY_HASH = CryptContext(schemes=['bcrypt_sha256'], bcrypt_sha256__default_rounds=4).hash('Password123!')
+
+def test_hash_and_verify_round_trip():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=2)
+    try:
+        password_hash = asyncio.run(hasher.hash('SecurePass123!'))
+        assert password_hash.startswith('$bcrypt-sha256$')
+        assert asyncio.run(hasher.verify('SecurePass123!', password_hash))
+        assert not asyncio.run(hasher.verify('WrongPass123!', password_hash))
+    finally:
+        hasher.shutdown()
+
+def test_process_pool_verifies_dummy_hash():
+    hasher = PasswordHasher(executor_kind='process', max_workers=1)
+    try:
+        assert asyncio.run(hasher.verify('Password123!', LEGACY_HASH))
+        assert hasher.stats()['completed'] == 1
+    finally:
+        hasher.shutdown()
+
+def test_metrics_split_queue_wait_from_hash_time():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1)
+
+    async def verify_concurrently():
+        await asyncio.gather(*(hasher.verify('Password123!', LEGACY_HASH) for _ in range(3)))
+
+    try:
+        asyncio.run(verify_concurrently())
+        stats = hasher.stats()
+        assert stats['completed'] == 3
+        assert stats['hash_time_avg'] > 0
+        # With a single worker the last job waits for the two ahead of it
+        assert stats['queue_wait_max'] >= stats['hash_time_avg']
+    finally:
+        hasher.shutdown()
+
+def test_full_queue_sheds_load_with_503():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1, max_queue=1)
+
+    async def overload():
+        return await asyncio.gather(*(hasher.verify('Password123!', LEGACY_HASH) for _ in range(3)), return_exceptions=True)
+
+    try:
+        results = asyncio.run(overload())
+        rejected = [result for result in results if isinstance(result, HTTPException)]
+        assert len(rejected) == 1
+        assert rejected[0].status_code == 503
+        assert hasher.stats()['rejected'] == 1
+    finally:
+        hasher.shutdown()
+
+def test_unknown_executor_kind():
+    with pytest.raises(ValueError):
+        PasswordHasher(executor_kind='gpu')
+
+def test_outdated_hash_is_upgraded_on_verify():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1, policy=HashPolicy(bcrypt_rounds=5))
+    try:
+        verified, new_hash = asyncio.run(hasher.verify_and_update('Password123!', LEGACY_HASH))
+        assert verified
+        assert '$bcrypt-sha256$v=2,t=2b,r=5$' in new_hash
+        assert asyncio.run(hasher.verify_and_update('Password123!', new_hash)) == (True, None)
+        assert asyncio.run(hasher.verify_and_update('WrongPass123!', LEGACY_HASH)) == (False, None)
+    finally:
+        hasher.shutdown()
+
+def test_stronger_hash_is_not_downgraded():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1, policy=HashPolicy(bcrypt_rounds=4))
+    try:
+        strong_hash = CryptContext(schemes=['bcrypt_sha256'], bcrypt_sha256__default_rounds=5).hash('Password123!')
+        assert asyncio.run(hasher.verify_and_update('Password123!', strong_hash)) == (True, None)
+    finally:
+        hasher.shutdown()
+
+def test_dummy_hash_follows_policy():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1, policy=HashPolicy(bcrypt_rounds=4))
+    try:
+        dummy_hash = asyncio.run(hasher.dummy_hash())
+        assert dummy_hash.startswith('$bcrypt-sha256$v=2,t=2b,r=4$')
+        assert asyncio.run(hasher.dummy_hash()) == dummy_hash
+        hasher.apply_policy(HashPolicy(bcrypt_rounds=5))
+        assert asyncio.run(hasher.dummy_hash()) != dummy_hash
+    finally:
+        hasher.shutdown()
+
+@pytest.mark.parametrize('target_ms, rounds', [(0, 10), (3_600_000, 16)])
+def test_calibration_picks_cost_within_bounds(target_ms, rounds):
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1, policy=HashPolicy(bcrypt_rounds=12, target_ms=target_ms))
+    try:
+        asyncio.run(hasher.calibrate())
+        assert hasher.stats()['bcrypt_rounds'] == rounds
+    finally:
+        hasher.shutdown()
+
+def test_warmup_calibrates_to_target(monkeypatch):
+    monkeypatch.setattr('backend.auth.hashing._calibrate_cost', lambda scheme, target_seconds, memory_cost: (11, 0.05))
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1, policy=HashPolicy(bcrypt_rounds=4, target_ms=100))
+    try:
+        asyncio.run(hasher.calibrate())
+        assert hasher.calibrated
+        assert hasher.stats()['bcrypt_rounds'] == 11
+        assert 'bcrypt_sha256__min_rounds = 11' in hasher.policy.to_config()
+    finally:
+        hasher.shutdown()
+
+def test_policy_rejects_unknown_schemes():
+    with pytest.raises(ValueError):
+        HashPolicy(schemes=('md5_crypt',))
+
+@pytest.mark.skipif(argon2_available(), reason='argon2-cffi is installed')
+def test_argon2_requires_optional_dependency():
+    with pytest.raises(RuntimeError):
+        HashPolicy(schemes=('argon2', 'bcrypt_sha256'))
+
+@pytest.mark.skipif(not argon2_available(), reason='argon2-cffi is not installed')
+def test_argon2_primary_upgrades_bcrypt_hashes():
+    hasher = PasswordHasher(executor_kind='thread', max_workers=1, policy=HashPolicy(schemes=('argon2', 'bcrypt_sha256'), argon2_time_cost=1, argon2_memory_cost=1024))
+    try:
+        verified, new_hash = asyncio.run(hasher.verify_and_update('Password123!', LEGACY_HASH))
+        assert verified
+        assert new_hash.startswith('$argon2')
+    finally:
+        hasher.shutdown()
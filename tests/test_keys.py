@@ -0,0 +1,104 @@
+import os
+import pytest
+from datetime import timedelta
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi.testclient import TestClient
+from jose import JWTError, jwk, jwt
+from backend.app import app
+from backend.auth import tokens
+from backend.auth.keys import KeyRing, generate_key
+from backend.auth.token_codecs import JoseCodec, PyJWTCodec
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def key_ring(tmp_path, monkeypatch):
+    generate_key(tmp_path, 'first')
+    clock = FakeClock()
+    ring = KeyRing(str(tmp_path), reload_interval=30, on_reload=tokens.token_cache.clear, clock=clock)
+    monkeypatch.setattr(tokens, 'key_ring', ring)
+    yield ring
+    tokens.token_cache.clear()
+
+def issue(user_id: int) -> str:
+    return tokens.create_access_token({'sub': str(user_id)}, expires_delta=timedelta(minutes=5))
+
+def test_tokens_are_signed_with_the_active_key(key_ring):
+    token = issue(90101)
+    assert jwt.get_unverified_header(token) == {'alg': 'ES256', 'typ': 'JWT', 'kid': 'first'}
+    assert tokens.decode_access_token(token) == 90101
+
+def test_jwks_lets_other_services_verify_locally(key_ring):
+    token = issue(90102)
+    response = TestClient(app).get('/.well-known/jwks.json')
+    assert response.status_code == 200
+    assert 'max-age' in response.headers['cache-control']
+    published = {key['kid']: key for key in response.json()['keys']}
+    assert set(published) == {'first'}
+    assert 'd' not in published['first']
+    public_key = jwk.construct(published['first'])
+    assert jwt.decode(token, public_key, algorithms=['ES256'])['sub'] == '90102'
+
+def test_hmac_mode_publishes_no_keys(monkeypatch):
+    monkeypatch.setattr(tokens, 'key_ring', None)
+    assert TestClient(app).get('/.well-known/jwks.json').json() == {'keys': []}
+
+def test_rotation_without_restart(key_ring, tmp_path):
+    old_token = issue(90103)
+    generate_key(tmp_path, 'second')
+    (tmp_path / 'active').write_text('second\n')
+    # Nothing is re-read until the reload interval has passed
+    assert jwt.get_unverified_header(issue(90103))['kid'] == 'first'
+    key_ring.clock.now += 30
+    new_token = issue(90103)
+    assert jwt.get_unverified_header(new_token)['kid'] == 'second'
+    assert tokens.decode_access_token(old_token) == 90103
+    assert tokens.decode_access_token(new_token) == 90103
+
+    os.remove(tmp_path / 'first.pem')
+    key_ring.clock.now += 30
+    with pytest.raises(JWTError):
+        tokens.decode_access_token(old_token)
+
+def test_unknown_kid_forces_a_reload(key_ring, tmp_path):
+    other = KeyRing(str(tmp_path), clock=key_ring.clock)
+    generate_key(tmp_path, 'third')
+    other.refresh(force=True)
+    token = jwt.encode({'sub': '90104'}, other.active().private_key, algorithm='ES256', headers={'kid': 'third'})
+    key_ring.clock.now += 1
+    assert tokens.decode_access_token(token) == 90104
+
+def test_unknown_kid_and_forged_tokens_are_rejected(key_ring):
+    with pytest.raises(JWTError):
+        tokens.decode_access_token(jwt.encode({'sub': '1'}, 'guess', algorithm='HS256', headers={'kid': 'first'}))
+    with pytest.raises(JWTError):
+        tokens.decode_access_token(jwt.encode({'sub': '1'}, 'guess', algorithm='HS256', headers={'kid': 'missing'}))
+
+def test_broken_key_file_keeps_the_last_good_keys(key_ring, tmp_path):
+    (tmp_path / 'broken.pem').write_text('not a key')
+    key_ring.clock.now += 30
+    assert key_ring.active().kid == 'first'
+
+def test_eddsa_keys_need_a_codec_that_supports_them(tmp_path, monkeypatch):
+    pem = ed25519.Ed25519PrivateKey.generate().private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    (tmp_path / 'ed.pem').write_bytes(pem)
+    with pytest.raises(RuntimeError):
+        KeyRing(str(tmp_path), algorithms=JoseCodec.algorithms)
+
+    ring = KeyRing(str(tmp_path), algorithms=PyJWTCodec.algorithms)
+    monkeypatch.setattr(tokens, 'key_ring', ring)
+    monkeypatch.setattr(tokens, 'codec', PyJWTCodec())
+    token = issue(90105)
+    assert jwt.get_unverified_header(token)['alg'] == 'EdDSA'
+    assert tokens.decode_access_token(token) == 90105
+    assert ring.jwks()['keys'][0]['crv'] == 'Ed25519'
+
+def test_empty_key_directory_fails_at_startup(tmp_path):
+    with pytest.raises(RuntimeError):
+        KeyRing(str(tmp_path))
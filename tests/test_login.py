@@ -3,8 +3,15 @@ from backend.auth.models.register_request import RegisterRequest
 from backend.auth.models.login_request import LoginRequest
 from fastapi.testclient import TestClient
 from backend.app import app
+from backend.auth import auth
+from backend.database.utils.db_utils import get_table_by_env
+from backend.database.utils.memory_client import get_memory_client
+from backend.database.utils.pool import PoolTimeoutError
 from tests.test_registration import cleanup_account
 from jose import jwt
+from passlib.context import CryptContext
+import asyncio
+import logging
 import os
 import time
 
@@ -412,4 +419,30 @@ def test_login_special_chars_in_password():
     login_request = LoginRequest(username=username, password=password).model_dump()
     response = client.post('api/auth/token', json=login_request)
     assert response.status_code == 200
-    cleanup_account(username)
\ No newline at end of file
+    cleanup_account(username)
+
+@pytest.mark.memory_backend
+def test_login_upgrades_outdated_password_hash():
+    username = 'legacyhashuser'
+    password = 'SecurePass123!'
+    cleanup_account(username)
+    legacy_hash = CryptContext(schemes=['bcrypt_sha256'], bcrypt_sha256__default_rounds=4).hash(password)
+    table = get_memory_client().get_table(get_table_by_env('users'))
+    table.rows.append({'id': next(table.ids), 'username': username, 'email': 'legacyhash@example.com', 'password': legacy_hash})
+
+    response = client.post('api/auth/token', json=LoginRequest(username=username, password=password).model_dump())
+    assert response.status_code == 200
+    stored_hash = next(row['password'] for row in table.rows if row['username'] == username)
+    assert stored_hash != legacy_hash
+    assert stored_hash.startswith('$bcrypt-sha256$v=2,t=2b,r=12$')
+    assert client.post('api/auth/token', json=LoginRequest(username=username, password=password).model_dump()).status_code == 200
+    cleanup_account(username)
+
+def test_failed_rehash_store_is_logged_not_raised(monkeypatch, caplog):
+    async def pool_exhausted(db, user_id, password_hash):
+        raise PoolTimeoutError('No database client available')
+
+    monkeypatch.setattr(auth, 'update_user_password', pool_exhausted)
+    with caplog.at_level(logging.ERROR, logger=auth.__name__):
+        asyncio.run(auth.store_rehashed_password(1, 'new-hash'))
+    assert 'Storing the rehashed password of user 1 failed' in caplog.text
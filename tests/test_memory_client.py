@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from postgrest.exceptions import APIError
+from backend.database.utils.memory_client import MemoryClient
+
+def run(query):
+    return asyncio.run(query.execute()).data
+
+def seeded_client():
+    db = MemoryClient()
+    run(db.table('users_test').insert([
+        {'username': 'alice', 'email': 'alice@test.com', 'password': 'a'},
+        {'username': 'bob', 'email': 'bob@test.com', 'password': 'b'},
+    ]))
+    return db
+
+def test_insert_assigns_serial_ids():
+    db = seeded_client()
+    assert [row['id'] for row in run(db.table('users_test').select('id'))] == [1, 2]
+
+def test_or_filter_matches_either_column():
+    db = seeded_client()
+    rows = run(db.table('users_test').select('id,username').or_('username.eq.bob@test.com,email.eq.bob@test.com').limit(1))
+    assert rows == [{'id': 2, 'username': 'bob'}]
+
+def test_in_filter_with_quoted_values():
+    db = seeded_client()
+    rows = run(db.table('users_test').select('username').or_('username.in.("alice","x,y"),email.in.("bob@test.com")'))
+    assert sorted(row['username'] for row in rows) == ['alice', 'bob']
+
+def test_eq_coerces_string_ids():
+    db = seeded_client()
+    assert run(db.table('users_test').select('username').eq('id', '2')) == [{'username': 'bob'}]
+
+def test_duplicate_insert_raises_unique_violation():
+    db = seeded_client()
+    with pytest.raises(APIError) as error:
+        run(db.table('users_test').insert({'username': 'carol', 'email': 'alice@test.com', 'password': 'c'}))
+    assert error.value.code == '23505'
+    assert error.value.details == 'Key (email)=(alice@test.com) already exists.'
+    assert len(run(db.table('users_test').select('id'))) == 2
+
+def test_delete_returns_deleted_rows():
+    db = seeded_client()
+    deleted = run(db.table('users_test').delete().eq('username', 'alice'))
+    assert [row['username'] for row in deleted] == ['alice']
+    assert run(db.table('users_test').select('username')) == [{'username': 'bob'}]
+
+def test_update_order_and_keyset_filters():
+    db = seeded_client()
+    run(db.table('users_test').update({'password': 'z'}).eq('id', 1))
+    rows = run(db.table('users_test').select('id,password').gt('id', 0).order('id', desc=True).limit(2))
+    assert rows == [{'id': 2, 'password': 'b'}, {'id': 1, 'password': 'z'}]
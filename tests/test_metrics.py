@@ -0,0 +1,83 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend import metrics
+from backend.database.utils import pool
+from backend.metrics import Registry, instrumented, server_timing, timed
+
+def make_app(**install_options):
+    app = FastAPI()
+
+    @app.get('/work')
+    async def work():
+        with timed('db.lookup'):
+            pass
+        with timed('hash'):
+            pass
+        return {'ok': True}
+
+    metrics.install(app, **install_options)
+    return app
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    histogram.observe(0.05, route='/a')
+    histogram.observe(0.5, route='/a')
+    histogram.observe(5.0, route='/a')
+    rendered = registry.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in rendered
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in rendered
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in rendered
+    assert 'latency_seconds_count{route="/a"} 3' in rendered
+
+def test_collectors_are_rendered_as_gauges():
+    registry = Registry()
+    registry.register_collector(metrics.stats_collector('cache', lambda: {'hits': 3, 'name': 'tokens'}))
+    rendered = registry.render()
+    assert 'cache_hits 3' in rendered
+    assert 'tokens' not in rendered
+
+def test_server_timing_sums_repeated_stages():
+    assert server_timing([('db.get_user', 0.001), ('db.get_user', 0.002), ('hash', 0.25)]) == 'db-get_user;dur=3.00, hash;dur=250.00'
+
+def test_disabled_metrics_leave_functions_untouched(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', False)
+
+    async def query():
+        return 1
+
+    assert instrumented('db.query')(query) is query
+    assert timed('db.query') is timed('hash')
+
+def test_middleware_adds_server_timing_and_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    client = TestClient(make_app(server_timing=True))
+    response = client.get('/work')
+    assert response.status_code == 200
+    server_timing_header = response.headers['server-timing']
+    assert 'db-lookup;dur=' in server_timing_header
+    assert 'hash;dur=' in server_timing_header
+    assert 'total;dur=' in server_timing_header
+
+    scrape = client.get('/metrics')
+    assert scrape.status_code == 200
+    assert 'thriftr_http_requests_total{method="GET",route="/work",status="200"}' in scrape.text
+    assert 'thriftr_stage_duration_seconds_count{stage="db.lookup"}' in scrape.text
+
+def test_server_timing_and_endpoint_are_opt_in(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    client = TestClient(make_app(serve_endpoint=False))
+    response = client.get('/work')
+    assert response.status_code == 200
+    assert 'server-timing' not in response.headers
+    assert client.get('/metrics').status_code == 404
+
+def test_metrics_endpoint_requires_scrape_token(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', True)
+    client = TestClient(make_app(scrape_token='scrape-secret'))
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+def test_pool_stats_are_empty_until_a_pool_is_opened():
+    assert pool.stats() == {}
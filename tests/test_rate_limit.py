@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from backend.app import app
+from backend.auth import auth
+from backend.auth.rate_limit import InMemoryRateLimitStore, LoginRateLimiter, RateLimit
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_limiter(clock, per_ip='5/minute', per_identifier='2/minute'):
+    return LoginRateLimiter(InMemoryRateLimitStore(), per_ip=RateLimit.parse(per_ip), per_identifier=RateLimit.parse(per_identifier), clock=clock)
+
+def test_identifier_bucket_sheds_with_retry_after():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    asyncio.run(limiter.check('10.0.0.1', 'victim'))
+    asyncio.run(limiter.check('10.0.0.2', 'Victim '))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(limiter.check('10.0.0.3', 'victim'))
+    assert error.value.status_code == 429
+    assert error.value.headers['Retry-After'] == '30'
+    assert limiter.stats() == {'allowed': 2, 'shed_ip': 0, 'shed_identifier': 1}
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    limiter = make_limiter(clock, per_identifier='1/second')
+    asyncio.run(limiter.check('10.0.0.1', 'user'))
+    with pytest.raises(HTTPException):
+        asyncio.run(limiter.check('10.0.0.1', 'user'))
+    clock.now += 1
+    asyncio.run(limiter.check('10.0.0.1', 'user'))
+
+def test_ip_bucket_sheds_across_identifiers():
+    clock = FakeClock()
+    limiter = make_limiter(clock, per_ip='3/minute')
+    for index in range(3):
+        asyncio.run(limiter.check('10.0.0.1', f'user{index}'))
+    with pytest.raises(HTTPException):
+        asyncio.run(limiter.check('10.0.0.1', 'user9'))
+    asyncio.run(limiter.check('10.0.0.2', 'user9'))
+    assert limiter.stats()['shed_ip'] == 1
+
+def test_store_evicts_least_recently_used_buckets():
+    store = InMemoryRateLimitStore(max_keys=2)
+    for key in ('a', 'b', 'c'):
+        assert asyncio.run(store.take(key, capacity=1, refill_rate=0.01, now=0)) == 0
+    # 'a' was evicted, so it starts again from a full bucket
+    assert asyncio.run(store.take('a', capacity=1, refill_rate=0.01, now=0)) == 0
+    assert asyncio.run(store.take('c', capacity=1, refill_rate=0.01, now=0)) > 0
+
+def test_invalid_limits_are_rejected():
+    with pytest.raises(ValueError):
+        RateLimit.parse('10/fortnight')
+    with pytest.raises(ValueError):
+        RateLimit.parse('0/minute')
+
+def test_shed_login_never_reaches_password_verify(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth, 'login_rate_limiter', make_limiter(clock, per_identifier='1/minute'))
+    verified = []
+
+    async def dummy_hash():
+        return 'unused'
+
+    async def verify(password, password_hash):
+        verified.append(password)
+        return False
+
+    monkeypatch.setattr(auth.password_hasher, 'dummy_hash', dummy_hash)
+    monkeypatch.setattr(auth.password_hasher, 'verify', verify)
+    client = TestClient(app)
+    body = {'username': 'stuffedaccount', 'password': 'Password123!'}
+    assert client.post('api/auth/token', json=body).status_code == 401
+    response = client.post('api/auth/token', json=body)
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    assert len(verified) == 1
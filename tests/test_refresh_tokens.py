@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from backend.app import app
+from backend.auth import auth
+from backend.database.utils.db_utils import db_session, get_table_by_env, get_user
+from backend.database.utils.memory_client import get_memory_client
+from tests.test_registration import cleanup_account
+
+client = TestClient(app)
+PASSWORD = 'RefreshPass123!'
+
+def login(username: str) -> dict:
+    cleanup_account(username)
+    client.post('api/auth/register', json={'username': username, 'email': f'{username}@example.com', 'password': PASSWORD})
+    response = client.post('api/auth/token', json={'username': username, 'password': PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+def refresh(refresh_token: str):
+    return client.post('api/auth/refresh', json={'refresh_token': refresh_token})
+
+def current_user(access_token: str):
+    return client.get('api/auth/current_user', headers={'Authorization': f'Bearer {access_token}'})
+
+async def stored_user(identifier: str) -> dict | None:
+    async with db_session() as db:
+        return await get_user(db, identifier)
+
+def test_refresh_rotates_without_verifying_the_password(monkeypatch):
+    tokens = login('refreshuser')
+    assert tokens['refresh_token']
+
+    async def fail_verify(*args):
+        raise AssertionError('refresh must not verify a password')
+
+    monkeypatch.setattr(auth.password_hasher, 'verify_and_update', fail_verify)
+    response = refresh(tokens['refresh_token'])
+    assert response.status_code == 200
+    renewed = response.json()
+    assert renewed['refresh_token'] != tokens['refresh_token']
+    assert current_user(renewed['access_token']).json()['username'] == 'refreshuser'
+    assert refresh(renewed['refresh_token']).status_code == 200
+    cleanup_account('refreshuser')
+
+def test_reused_refresh_token_revokes_the_family():
+    tokens = login('reuseduser')
+    renewed = refresh(tokens['refresh_token']).json()
+
+    # The first token comes back after it was rotated, as if it had been stolen
+    assert refresh(tokens['refresh_token']).status_code == 401
+    assert refresh(renewed['refresh_token']).status_code == 401
+    assert current_user(renewed['access_token']).status_code == 401
+    # A revoked token cannot delete the account either
+    assert client.delete('api/auth/current_user', headers={'Authorization': f"Bearer {renewed['access_token']}"}).status_code == 401
+
+    # Logging in again starts a new family that works normally
+    response = client.post('api/auth/token', json={'username': 'reuseduser', 'password': PASSWORD})
+    assert current_user(response.json()['access_token']).status_code == 200
+    assert refresh(response.json()['refresh_token']).status_code == 200
+    cleanup_account('reuseduser')
+
+def test_reuse_revocation_is_stored_with_the_user():
+    tokens = login('storedrevocation')
+    refresh(tokens['refresh_token'])
+    assert refresh(tokens['refresh_token']).status_code == 401
+
+    # Other workers and restarted ones read the same version, nothing about the revocation lives in this process
+    assert asyncio.run(stored_user('storedrevocation'))['token_version'] == 1
+    response = client.post('api/auth/token', json={'username': 'storedrevocation', 'password': PASSWORD})
+    assert jwt.get_unverified_claims(response.json()['access_token'])['ver'] == 1
+    assert current_user(response.json()['access_token']).status_code == 200
+    cleanup_account('storedrevocation')
+
+@pytest.mark.memory_backend
+def test_unknown_and_expired_refresh_tokens_are_rejected():
+    tokens = login('expireduser')
+    assert refresh('not-a-real-token').status_code == 401
+    table = get_memory_client().get_table(get_table_by_env('refresh_tokens'))
+    for row in table.rows:
+        row['expires_at'] = '2000-01-01T00:00:00+00:00'
+    assert refresh(tokens['refresh_token']).status_code == 401
+    cleanup_account('expireduser')
+
+def test_deleting_the_account_revokes_refresh_tokens():
+    tokens = login('deletedrefresh')
+    assert client.delete('api/auth/current_user', headers={'Authorization': f"Bearer {tokens['access_token']}"}).status_code == 200
+    assert refresh(tokens['refresh_token']).status_code == 401
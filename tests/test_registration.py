@@ -3,16 +3,15 @@ from backend.auth.models.register_request import RegisterRequest
 from backend.auth.models.login_request import LoginRequest
 from fastapi.testclient import TestClient
 from backend.app import app
+from backend.database.utils.db_utils import UserConflictError, conflicting_field
+from postgrest.exceptions import APIError
 import os
 
 client = TestClient(app)
 
-def cleanup_account(identifier: str):
-    lookup_result = client.get('api/db/accounts/lookup', params={'identifier': identifier}).json()
-    
-    if lookup_result.get('found'):
-        delete_result = client.delete('api/db/accounts/delete', params={'identifier': identifier})
-        assert delete_result.status_code == 200, f"Failed to delete account {identifier} during cleanup."  
+def cleanup_account(*identifiers: str):
+    delete_result = client.post('api/db/accounts/batch/delete', json={'identifiers': list(identifiers)})
+    assert delete_result.status_code == 200, f"Failed to delete accounts {identifiers} during cleanup."
 
 def test_dupe_username():
     username = 'test'
@@ -48,4 +47,18 @@ def test_dupe_email():
     assert first_register.status_code == 200
 
     second_register = client.post('api/auth/register', json=request_b)
-    assert second_register.status_code == 409
\ No newline at end of file
+    assert second_register.status_code == 409
+
+@pytest.mark.parametrize("error, field", [
+    ({'code': '23505', 'message': 'duplicate key value violates unique constraint "users_test_username_key"', 'details': 'Key (username)=(test) already exists.'}, 'username'),
+    ({'code': '23505', 'message': 'duplicate key value violates unique constraint "users_test_email_key"', 'details': 'Key (email)=(my_username_@test.com) already exists.'}, 'email'),
+    ({'code': '23505', 'message': 'duplicate key value violates unique constraint "users_email_key"', 'details': None}, 'email'),
+    ({'code': '23505', 'message': 'duplicate key value violates unique constraint "users_pkey"', 'details': None}, None),
+    ({'code': '23502', 'message': 'null value in column "email" violates not-null constraint', 'details': None}, None),
+])
+def test_conflicting_field(error, field):
+    assert conflicting_field(APIError(error)) == field
+
+def test_unidentified_conflict_is_reported_generically():
+    assert str(UserConflictError(None)) == 'Account already exists'
+    assert str(UserConflictError('email')) == 'Account with that email already exists'
@@ -0,0 +1,51 @@
+import os
+from backend import server
+
+def test_server_config_reads_environment(monkeypatch):
+    monkeypatch.setenv('SERVER_WORKERS', '3')
+    monkeypatch.setenv('SERVER_KEEPALIVE', '30')
+    monkeypatch.setenv('SERVER_MAX_REQUESTS', '10000')
+    config = server.server_config()
+    assert config['workers'] == 3
+    assert config['loop'] == 'uvloop'
+    assert config['http'] == 'httptools'
+    assert config['lifespan'] == 'on'
+    assert config['timeout_keep_alive'] == 30
+    assert config['limit_max_requests'] == 10000
+    assert config['access_log'] is False
+
+def test_server_config_defaults_to_one_worker_per_core(monkeypatch):
+    monkeypatch.delenv('SERVER_WORKERS', raising=False)
+    monkeypatch.delenv('SERVER_MAX_REQUESTS', raising=False)
+    config = server.server_config()
+    assert config['workers'] == server.available_cores()
+    assert config['limit_max_requests'] is None
+
+def test_hash_workers_are_split_between_server_workers(monkeypatch):
+    # Set first so monkeypatch restores the environment after share_cores() writes to it
+    monkeypatch.setenv('HASH_MAX_WORKERS', '')
+    monkeypatch.delenv('HASH_MAX_WORKERS')
+    monkeypatch.setattr(server, 'available_cores', lambda: 8)
+    server.share_cores(4)
+    assert os.environ['HASH_MAX_WORKERS'] == '2'
+    monkeypatch.setenv('HASH_MAX_WORKERS', '5')
+    server.share_cores(4)
+    assert os.environ['HASH_MAX_WORKERS'] == '5'
+
+def test_worker_state_is_split_between_server_workers(monkeypatch):
+    for name in ('LOGIN_RATE_LIMIT_IP', 'LOGIN_RATE_LIMIT_IDENTIFIER', 'USER_CACHE_TTL', 'TOKEN_VERSION_CACHE_TTL'):
+        monkeypatch.setenv(name, '')
+        monkeypatch.delenv(name)
+    monkeypatch.setenv('LOGIN_RATE_LIMIT_IP', '100/hour')
+    monkeypatch.setenv('USER_CACHE_TTL', '30')
+    server.share_worker_state(4)
+    assert os.environ['LOGIN_RATE_LIMIT_IP'] == '25/hour'
+    # Default 10/minute, never below one attempt per worker
+    assert os.environ['LOGIN_RATE_LIMIT_IDENTIFIER'] == '2/minute'
+    assert os.environ['USER_CACHE_TTL'] == '30'
+    assert os.environ['TOKEN_VERSION_CACHE_TTL'] == server.MULTI_WORKER_CACHE_TTL
+
+def test_single_worker_keeps_configured_limits(monkeypatch):
+    monkeypatch.setenv('LOGIN_RATE_LIMIT_IP', '30/minute')
+    server.share_worker_state(1)
+    assert os.environ['LOGIN_RATE_LIMIT_IP'] == '30/minute'
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from pydantic import ValidationError
+from backend.settings import Settings, get_settings
+from backend.database.utils.db_utils import get_table_by_env
+
+def test_settings_are_resolved_once():
+    assert get_settings() is get_settings()
+    assert get_settings().env == 'test'
+    assert get_table_by_env('users') == 'users_test'
+
+def test_settings_read_the_environment(monkeypatch):
+    monkeypatch.setenv('ENV', 'prod')
+    monkeypatch.setenv('AUTH_TOKEN_MODE', 'claims')
+    monkeypatch.setenv('STARTUP_WARMUP', 'background')
+    settings = Settings(_env_file=None)
+    assert (settings.env, settings.auth_token_mode, settings.startup_warmup) == ('prod', 'claims', 'background')
+
+def test_invalid_settings_are_rejected(monkeypatch):
+    monkeypatch.setenv('ENV', 'staging')
+    with pytest.raises(ValidationError):
+        Settings(_env_file=None)
+    monkeypatch.setenv('ENV', 'test')
+    monkeypatch.setenv('AUTH_TOKEN_MODE', 'everything')
+    with pytest.raises(ValidationError):
+        Settings(_env_file=None)
+
+def test_dotenv_reaches_component_settings(tmp_path):
+    # Knobs that components read from os.environ themselves pick up .env too, and the real environment wins
+    (tmp_path / '.env').write_text('REFRESH_TOKEN_TTL_DAYS=7\nUSER_LOOKUP_COALESCING=false\n')
+    env = {key: value for key, value in os.environ.items() if key != 'REFRESH_TOKEN_TTL_DAYS'}
+    env.update(PYTHONPATH=str(Path(__file__).resolve().parent.parent), USER_LOOKUP_COALESCING='true')
+    probe = 'from backend.auth.refresh_tokens import REFRESH_TOKEN_TTL\nfrom backend.database.utils.single_flight import user_lookups\nprint(REFRESH_TOKEN_TTL.days, user_lookups.enabled)'
+    completed = subprocess.run([sys.executable, '-c', probe], cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    assert completed.stdout.split() == ['7', 'True']
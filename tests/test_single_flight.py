@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from backend.database.utils import db_utils
+from backend.database.utils.single_flight import SingleFlight
+from backend.database.utils.memory_client import get_memory_client
+
+def test_concurrent_calls_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'id': 1}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do('user:1', load) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert calls == [1]
+    assert results == [{'id': 1}] * 5
+    assert flight.stats() == {'calls': 5, 'coalesced': 4, 'in_flight': 0}
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('database down')
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do('user:1', fail) for _ in range(3)), return_exceptions=True)
+        # A later call runs again instead of replaying the failure
+        with pytest.raises(RuntimeError):
+            await flight.do('user:1', fail)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert calls == [1, 1]
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.02)
+        return 'row'
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do('key', load))
+        second = asyncio.ensure_future(flight.do('key', load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == 'row'
+
+def test_disabled_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return None
+
+    async def scenario():
+        await asyncio.gather(*(flight.do('key', load) for _ in range(3)))
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+
+@pytest.mark.memory_backend
+def test_concurrent_user_lookups_send_one_query():
+    db = get_memory_client()
+    table = db_utils.get_table_by_env('users')
+
+    async def scenario():
+        created = await db_utils.insert_user(db, 'flightuser', 'flight@example.com', 'hash')
+        before = len(db.executed)
+        by_id = await asyncio.gather(*(db_utils.get_user_by_id(db, created['id'], columns=db_utils.PROFILE_COLUMNS) for _ in range(4)))
+        by_name = await asyncio.gather(*(db_utils.get_user(db, 'flightuser', columns=db_utils.PROFILE_COLUMNS) for _ in range(4)))
+        queries = db.executed[before:]
+        await db_utils.delete_user(db, 'flightuser')
+        return by_id, by_name, queries
+
+    by_id, by_name, queries = asyncio.run(scenario())
+    assert queries == [(table, 'select'), (table, 'select')]
+    assert all(user['username'] == 'flightuser' for user in by_id + by_name)
+    # Every caller gets its own row, so one changing it does not affect the others
+    by_id[0].pop('email')
+    assert 'email' in by_id[1]
+
+@pytest.mark.memory_backend
+def test_credential_lookups_are_not_coalesced():
+    db = get_memory_client()
+    table = db_utils.get_table_by_env('users')
+
+    async def scenario():
+        await db_utils.insert_user(db, 'credentialuser', 'credential@example.com', 'hash')
+        before = len(db.executed)
+        users = await asyncio.gather(*(db_utils.get_user(db, 'credentialuser') for _ in range(3)))
+        queries = db.executed[before:]
+        await db_utils.delete_user(db, 'credentialuser')
+        return users, queries
+
+    users, queries = asyncio.run(scenario())
+    assert queries == [(table, 'select')] * 3
+    assert all(user['password'] == 'hash' for user in users)
+
+@pytest.mark.memory_backend
+def test_shared_lookup_runs_on_the_callers_client():
+    # No second lease per lookup, a request that holds the pool's last lease must still be able to load its user
+    db = get_memory_client()
+    tables = []
+
+    class LeasedClient:
+        def table(self, name):
+            tables.append(name)
+            return db.table(name)
+
+    async def scenario():
+        created = await db_utils.insert_user(db, 'sessionuser', 'session@example.com', 'hash')
+        leased = LeasedClient()
+        users = await asyncio.gather(*(db_utils.get_user_by_id(leased, created['id'], columns=db_utils.PROFILE_COLUMNS) for _ in range(3)))
+        await db_utils.delete_user(db, 'sessionuser')
+        return users
+
+    assert all(user['username'] == 'sessionuser' for user in asyncio.run(scenario()))
+    assert tables == [db_utils.get_table_by_env('users')]
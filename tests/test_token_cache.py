@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+from backend.auth.token_cache import TokenCache, TokenVersionCache
+from backend.auth.tokens import AccessClaims, create_access_token, decode_access_token, token_cache
+
+def test_cache_hit_after_put():
+    cache = TokenCache(max_size=10)
+    assert cache.get('token-a') is None
+    cache.put('token-a', AccessClaims(user_id=7), time.time() + 60)
+    assert cache.get('token-a').user_id == 7
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_expired_entries_are_not_served():
+    cache = TokenCache(max_size=10)
+    cache.put('token-a', AccessClaims(user_id=7), time.time() + 0.05)
+    time.sleep(0.1)
+    assert cache.get('token-a') is None
+    assert cache.stats()['size'] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_size=2)
+    expires_at = time.time() + 60
+    cache.put('token-a', AccessClaims(user_id=1), expires_at)
+    cache.put('token-b', AccessClaims(user_id=2), expires_at)
+    cache.get('token-a')
+    cache.put('token-c', AccessClaims(user_id=3), expires_at)
+    assert cache.get('token-b') is None
+    assert cache.get('token-a').user_id == 1
+    assert cache.get('token-c').user_id == 3
+
+def test_invalidate_user_drops_all_their_tokens():
+    cache = TokenCache(max_size=10)
+    expires_at = time.time() + 60
+    cache.put('token-a', AccessClaims(user_id=1), expires_at)
+    cache.put('token-b', AccessClaims(user_id=1), expires_at)
+    cache.put('token-c', AccessClaims(user_id=2), expires_at)
+    assert cache.invalidate_user(1) == 2
+    assert cache.get('token-a') is None
+    assert cache.get('token-b') is None
+    assert cache.get('token-c').user_id == 2
+
+def test_decode_access_token_populates_cache():
+    token = create_access_token({'sub': '7'}, expires_delta=timedelta(minutes=5))
+    assert decode_access_token(token) == 7
+    hits = token_cache.hits
+    assert decode_access_token(token) == 7
+    assert token_cache.hits == hits + 1
+
+def test_token_versions_expire_and_never_go_back():
+    versions = TokenVersionCache(max_size=10, ttl=60)
+    assert versions.get(7) is None
+    versions.put(7, 2)
+    versions.put(7, 1)
+    assert versions.get(7) == 2
+    versions.invalidate_user(7)
+    assert versions.get(7) is None
+    short = TokenVersionCache(max_size=10, ttl=0.05)
+    short.put(7, 0)
+    time.sleep(0.1)
+    assert short.get(7) is None
@@ -0,0 +1,50 @@
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose.exceptions import ExpiredSignatureError, JWTError
+from backend.auth.token_codecs import HmacCodec, JoseCodec, PyJWTCodec, get_codec
+
+SECRET = 'codec-test-secret-key-0123456789'
+CODECS = [JoseCodec(), PyJWTCodec(), HmacCodec()]
+
+def claims(minutes: int = 5) -> dict:
+    return {'sub': '7', 'exp': datetime.now(timezone.utc) + timedelta(minutes=minutes)}
+
+@pytest.mark.parametrize('encoder', CODECS, ids=lambda codec: codec.name)
+@pytest.mark.parametrize('decoder', CODECS, ids=lambda codec: codec.name)
+def test_hmac_tokens_are_interchangeable(encoder, decoder):
+    token = encoder.encode(claims(), SECRET, 'HS256', headers={'kid': 'k1'})
+    assert decoder.decode(token, SECRET, 'HS256')['sub'] == '7'
+    assert decoder.unverified_header(token)['kid'] == 'k1'
+
+@pytest.mark.parametrize('encoder', CODECS[:2], ids=lambda codec: codec.name)
+@pytest.mark.parametrize('decoder', CODECS[:2], ids=lambda codec: codec.name)
+def test_es256_tokens_are_interchangeable(encoder, decoder):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    token = encoder.encode(claims(), private_key, 'ES256')
+    assert decoder.decode(token, private_key.public_key(), 'ES256')['sub'] == '7'
+
+@pytest.mark.parametrize('codec', CODECS, ids=lambda codec: codec.name)
+def test_codecs_reject_bad_tokens_with_jose_errors(codec):
+    token = codec.encode(claims(), SECRET, 'HS256')
+    with pytest.raises(JWTError):
+        codec.decode(token, 'another-secret-key-0123456789abc', 'HS256')
+    with pytest.raises(JWTError):
+        codec.decode(token, SECRET, 'HS512')
+    with pytest.raises(JWTError):
+        codec.decode(token[:-4] + 'AAAA', SECRET, 'HS256')
+    with pytest.raises(JWTError):
+        codec.decode('not.a.token', SECRET, 'HS256')
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(codec.encode(claims(minutes=-1), SECRET, 'HS256'), SECRET, 'HS256')
+
+def test_hmac_codec_checks_not_before():
+    codec = HmacCodec()
+    token = codec.encode({'sub': '7', 'nbf': int(time.time()) + 60}, SECRET, 'HS256')
+    with pytest.raises(JWTError):
+        codec.decode(token, SECRET, 'HS256')
+
+def test_unknown_codec():
+    with pytest.raises(RuntimeError):
+        get_codec('fastest')
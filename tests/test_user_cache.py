@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from backend.database.models.user import UserRow
+from backend.database.utils import db_utils
+from backend.database.utils.memory_client import get_memory_client
+from backend.database.utils.user_cache import UserCache, InMemoryCacheBackend, MISSING
+
+class DictBackend(InMemoryCacheBackend):
+    """Stand-in for a shared cache that records every key it is asked to drop"""
+    def __init__(self):
+        super().__init__()
+        self.deleted = []
+
+    async def delete(self, key):
+        self.deleted.append(key)
+        await super().delete(key)
+
+def make_loader(rows):
+    calls = []
+    async def loader_for(user_id):
+        calls.append(user_id)
+        row = rows.get(user_id)
+        return dict(row) if row else None
+    return calls, loader_for
+
+def test_profile_is_loaded_once_then_served_from_cache():
+    calls, load = make_loader({1: {'id': 1, 'username': 'alice', 'email': 'alice@test.com', 'password': 'hash'}})
+    cache = UserCache(InMemoryCacheBackend(), ttl=60)
+
+    async def scenario():
+        first = await cache.get_or_load('users_test', 1, lambda: load(1))
+        second = await cache.get_or_load('users_test', 1, lambda: load(1))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert calls == [1]
+    assert first.username == second.username == 'alice'
+    assert 'password' not in second.model_dump()
+    assert cache.stats() == {'hits': 1, 'misses': 1}
+
+def test_missing_user_is_negatively_cached():
+    calls, load = make_loader({})
+    cache = UserCache(InMemoryCacheBackend(), negative_ttl=60)
+
+    async def scenario():
+        return [await cache.get_or_load('users_test', 9, lambda: load(9)) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [None, None, None]
+    assert calls == [9]
+
+def test_invalidate_forces_reload():
+    calls, load = make_loader({1: {'id': 1, 'username': 'alice', 'email': 'alice@test.com', 'password': 'hash'}})
+    backend = DictBackend()
+    cache = UserCache(backend)
+
+    async def scenario():
+        await cache.get_or_load('users_test', 1, lambda: load(1))
+        await cache.invalidate('users_test', 1)
+        await cache.get_or_load('users_test', 1, lambda: load(1))
+
+    asyncio.run(scenario())
+    assert calls == [1, 1]
+    assert backend.deleted == ['users_test:1']
+
+def test_in_memory_backend_expires_entries():
+    backend = InMemoryCacheBackend()
+
+    async def scenario():
+        await backend.set('key', {'id': 1}, ttl=0.01)
+        await asyncio.sleep(0.05)
+        return await backend.get('key')
+
+    assert asyncio.run(scenario()) is MISSING
+
+@pytest.mark.memory_backend
+def test_profile_lookup_skips_the_password_column():
+    db = get_memory_client()
+
+    async def scenario():
+        created = await db_utils.insert_user(db, 'projectionuser', 'projection@example.com', 'hash')
+        row = await db_utils.get_user_by_id(db, created['id'], columns=db_utils.PROFILE_COLUMNS)
+        profile = await db_utils.get_user_profile(db, created['id'])
+        await db_utils.delete_user(db, 'projectionuser')
+        return created['id'], row, profile
+
+    user_id, row, profile = asyncio.run(scenario())
+    assert row == {'id': user_id, 'username': 'projectionuser', 'email': 'projection@example.com', 'token_version': 0}
+    assert profile == UserRow(id=user_id, username='projectionuser', email='projection@example.com')
+    assert profile.model_dump() == {'id': user_id, 'username': 'projectionuser', 'email': 'projection@example.com', 'is_active': True}